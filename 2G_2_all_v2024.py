@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Searches for all *.dat files from the 2G cryogenic system present in the folder
+where this script is located.
+Parses each file once and generates, in the same pass, the *.asc and *.rs3
+file of each specimen and the Utrecht_format.th file with all of them.
+Use --formats to generate only some of them (e.g. --formats asc,th).
+"""
+
+from paleoconv.pipeline import main
+
+
+if __name__=='__main__':
+    main()
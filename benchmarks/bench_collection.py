@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Time to get a collection of specimens ready for the analysis: parsing of
+the *.dat files (Collection.from_files) against loading of the binary file
+saved with Collection.save (load_collection, with and without mmap).
+
+Usage: python benchmarks/bench_collection.py [--files 10000] [--workdir DIR]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from make_corpus import write_corpus
+from paleoconv.pipeline import filename
+from paleoconv.store import Collection, load_collection
+
+
+def timed(function, *args):
+    t0=time.perf_counter()
+    result=function(*args)
+    return result, time.perf_counter()-t0
+
+
+def benchmark(n_files, workdir):
+    folder=os.path.join(workdir, f'dat_{n_files}')
+    if not os.path.isdir(folder):
+        write_corpus(folder, n_files, seed=n_files)
+    files=filename(folder, verbose=False)
+    name_npz=os.path.join(workdir, f'collection_{n_files}.npz')
+    
+    collection, t_parse=timed(Collection.from_files, files)
+    _, t_save=timed(collection.save, name_npz)
+    loaded, t_mmap=timed(load_collection, name_npz)
+    # Loading alone does not read the columns: time also a first use
+    _, t_use=timed(lambda: float(loaded.steps['j'].sum()))
+    _, t_read=timed(load_collection, name_npz, False)
+    
+    n_steps=len(collection.steps)
+    print(f'{n_files} files, {n_steps} steps, {os.path.getsize(name_npz)/1e6:.1f} MB')
+    print(f'{"parse *.dat (from_files)":32}{t_parse:10.3f} s')
+    print(f'{"save .npz":32}{t_save:10.3f} s')
+    print(f'{"load_collection (mmap)":32}{1000*t_mmap:10.2f} ms')
+    print(f'{"  + sum of one step column":32}{1000*t_use:10.2f} ms')
+    print(f'{"load_collection (read)":32}{1000*t_read:10.2f} ms')
+
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Parsing of *.dat files against loading a saved collection')
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--workdir', default=None,
+                        help='folder where the corpus is written and kept between runs')
+    args=parser.parse_args()
+    
+    if args.workdir is None:
+        with tempfile.TemporaryDirectory() as workdir:
+            benchmark(args.files, workdir)
+    else:
+        benchmark(args.files, args.workdir)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Conversion with the reading, conversion and writing overlapped (--io-threads)
+against the serial conversion, on a folder with a latency on each read.
+
+The latency of a network share is simulated with a pause before each read
+of a *.dat file (--latency, in ms), or a real folder (e.g. a mounted share)
+can be given with --folder and --latency 0.
+
+Usage: python benchmarks/bench_overlap.py [--files 2000] [--latency 5]
+           [--threads 1,4,16] [--folder DIR]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from make_corpus import write_corpus
+from paleoconv import pipeline
+
+
+def slow_reader(read, latency):
+    """
+    read_dat with a pause of 'latency' seconds before each read
+    """
+    
+    def read_dat(file_name):
+        time.sleep(latency)
+        return read(file_name)
+    
+    return read_dat
+
+
+def measure(folder, threads):
+    """
+    Seconds of the conversion of the folder to *.asc and *.rs3
+    """
+    
+    files=pipeline.filename(folder, verbose=False)
+    t0=time.perf_counter()
+    pipeline.convert(files, ('asc', 'rs3'), folder=folder, io_threads=threads)
+    return time.perf_counter()-t0
+
+
+def benchmark(folder, latency, threads):
+    pipeline.read_dat=slow_reader(pipeline.read_dat, latency/1000)
+    n_files=len(pipeline.filename(folder, verbose=False))
+    
+    print(f'{n_files} files, {latency} ms per read')
+    print(f'{"io threads":12}{"s":>9}{"files/s":>10}')
+    for n in [0]+threads:
+        sys.stdout=open(os.devnull, 'w')
+        try:
+            seconds=measure(folder, n)
+        finally:
+            sys.stdout.close()
+            sys.stdout=sys.__stdout__
+        print(f'{n if n else "serial":<12}{seconds:9.2f}{n_files/seconds:10.0f}')
+
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Overlapped against serial conversion')
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=5., help='ms added to each read')
+    parser.add_argument('--threads', default='1,4,16', help='numbers of I/O threads to measure')
+    parser.add_argument('--folder', default=None, help='folder with *.dat files to convert')
+    args=parser.parse_args()
+    threads=[int(n) for n in args.threads.split(',')]
+    
+    if args.folder is not None:
+        benchmark(args.folder, args.latency, threads)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            write_corpus(workdir, args.files, seed=args.files)
+            benchmark(workdir, args.latency, threads)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Micro-benchmark of the RS3 writer: templates and a single write per file
+(paleoconv.rs3) against the previous way, with .ljust()/.rjust() chains
+and csv.writer. It also checks that both give the same bytes.
+
+Usage: python benchmarks/bench_rs3_writer.py [number of steps] [repetitions]
+"""
+
+import csv
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from paleoconv.rs3 import format_RS3, rs3_text
+
+
+def format_RS3_ljust(header, data):
+    """
+    RS3 rows as they were built before the templates
+    """
+    
+    out=[]
+        
+    header_1=['Name'.ljust(10)+ 'Site'.ljust(10)+ 'Latitude'.ljust(10)+ 'Longitude'.ljust(11)+
+          'Height'.ljust(10)+ 'Rock'.ljust(15)+ 'Age'.ljust(5)+ 'Fm'.ljust(3)+
+          'SDec'.ljust(6)+ 'SInc'.ljust(6)+ 'BDec'.ljust(6)+ 'BInc'.ljust(6)+
+          'FDec'.ljust(6)+'FInc'.ljust(6)+ 'P1'.ljust(3)+ 'P2'.ljust(3)+ 'P3'.ljust(3)+
+          'P4'.ljust(3)+ 'Note'.ljust(4)]
+
+    name=header[0]
+    az=header[4]
+    pl=header[5]
+    dipdir=header[6]
+    if header[8]==0:
+        dip=header[7]
+    else:
+        dip=str(180-int(header[7]))
+
+    datos_muestra=[name.ljust(74)+az.ljust(6)+ pl.ljust(6)+ dipdir.ljust(6)+ dip.ljust(18)+
+                  '12'.ljust(3)+ '90'.ljust(3)+ '12'.ljust(3)+ '0'.ljust(7)]
+
+    if len(data)>0:
+        if data[-1][0][-1:]=='C':
+            treat='T'
+            unidades='Step[°C]'
+        else:
+            treat='A'
+            unidades='Step[mT]'
+    else: unidades='Step[°C]'
+
+    header_2=['ID'.ljust(3)+ unidades.ljust(17)+'M[A/m]'.ljust(9)+'Dsp'.ljust(6)+'Isp'.ljust(6)+
+             'Dge'.ljust(6)+'Ige'.ljust(6)+'Dtc'.ljust(6)+'Itc'.ljust(6)+'Dfc'.ljust(6)+'Ifc'.ljust(6)+
+             'Prec'.ljust(8)+'K[e-06 SI]'.ljust(11)+'Limit1'.ljust(10)+'Limit2'.ljust(10)+'Note'.ljust(10)]
+    
+    out.append(header_1)
+    out.append(datos_muestra)
+    out.append(header_2)
+    
+    for dato in data:
+        if dato[0]=='NRM':
+            id='N'
+            step=0
+        else:
+            if treat=='T':
+                id='T'
+                step=dato[0][:-1]
+            else:
+                id='A'
+                step=dato[0][:-4]
+
+        mag=format(float(dato[8])*1000, "1e")
+        prec='1.0'
+        
+        out.append([id.ljust(3)+ str(step).ljust(3)+ str(mag).rjust(21)+ str(dato[1]).rjust(6)+
+                    str(dato[2]).rjust(6)+ str(dato[3]).rjust(6)+ str(dato[4]).rjust(6)+
+                    str(dato[5]).rjust(6)+ str(dato[6]).rjust(6)+ str(prec).rjust(18)+ ' '.rjust(45)])
+
+    return out
+
+
+def write_csv(header, data):
+    """
+    Previous writer: csv.writer, one row at a time
+    """
+    
+    file_out=io.StringIO()
+    writer=csv.writer(file_out, lineterminator='\r\n')
+    for row in format_RS3_ljust(header, data):
+        writer.writerow(row)
+    return file_out.getvalue()
+
+
+def write_template(header, data):
+    """
+    Current writer: templates and a single string per file
+    """
+    
+    return rs3_text(format_RS3(header, data))
+
+
+def synthetic_specimen(n_steps):
+    """
+    Header and steps of a thermal demagnetization with n_steps steps
+    """
+    
+    header=['BU-01A, "x"', '10.5', 1, 0, '123', '45', '270', '30', 1, 'Nov 05 2019 15:12']
+    data=[['NRM' if i==0 else f'{i*25}C']+[f'{(i*37.3)%360:.1f}']*6+['1.234E-05', f'{i+1}.5E-04']+
+          ['1.0E-06']*15+['x', 'Nov 05 2019 10:20:00'] for i in range(n_steps)]
+    return header, data
+
+
+if __name__=='__main__':
+    n_steps=int(sys.argv[1]) if len(sys.argv)>1 else 20
+    repeat=int(sys.argv[2]) if len(sys.argv)>2 else 2000
+    
+    header, data=synthetic_specimen(n_steps)
+    assert write_csv(header, data)==write_template(header, data), 'different output'
+    
+    for name, func in (('csv.writer + ljust', write_csv), ('templates + one write', write_template)):
+        t=min(timeit.repeat(lambda: func(header, data), number=repeat, repeat=5))
+        print(f'{name:24s} {t/repeat*1e6:8.1f} µs per file ({n_steps} steps)')
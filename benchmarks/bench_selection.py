@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Conversion of a selection of the specimens and steps (--specimen, --demag,
+--steps) against the conversion of all of them: the selection is pushed
+down into the parser, so the specimens and steps that are left out are
+not decoded.
+
+Usage: python benchmarks/bench_selection.py [--files 5000] [--workdir DIR]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from make_corpus import write_corpus
+from paleoconv import pipeline
+from paleoconv.specimen import Selection, select_specimens
+
+# Name and selection of each measurement
+CASES=[('all', Selection()),
+       ('--specimen S00000', Selection(names=['S00000'])),
+       ('--demag thermal', Selection(demag='thermal')),
+       ('--steps NRM', Selection(steps=['NRM'])),
+       ('--steps NRM,*mT', Selection(steps=['NRM', '*mT']))]
+
+
+def measure(folder, selection):
+    """
+    Seconds of the selection and the conversion of the folder to all the
+    formats, and number of files converted
+    """
+    
+    files=pipeline.filename(folder, verbose=False)
+    t0=time.perf_counter()
+    if selection.specimens:
+        files=select_specimens(files, selection)
+    pipeline.convert(files, folder=folder, keep=selection.keep)
+    return time.perf_counter()-t0, len(files)
+
+
+def benchmark(n_files, workdir):
+    folder=os.path.join(workdir, f'dat_{n_files}')
+    if not os.path.isdir(folder):
+        write_corpus(folder, n_files, seed=n_files)
+    
+    print(f'{n_files} files')
+    print(f'{"selection":20}{"files":>8}{"s":>9}')
+    for name, selection in CASES:
+        sys.stdout=open(os.devnull, 'w')
+        try:
+            seconds, n=measure(folder, selection)
+        finally:
+            sys.stdout.close()
+            sys.stdout=sys.__stdout__
+        print(f'{name:20}{n:8}{seconds:9.2f}')
+
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Conversion of a selection against all the specimens')
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--workdir', default=None,
+                        help='folder where the corpus is written and kept between runs')
+    args=parser.parse_args()
+    
+    if args.workdir is None:
+        with tempfile.TemporaryDirectory() as workdir:
+            benchmark(args.files, workdir)
+    else:
+        benchmark(args.files, args.workdir)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Startup time of the converters: time of a new Python process that imports
+each module or runs each script with --help, against an empty interpreter.
+It also checks that importing the modules does not import NumPy and does
+not write or print anything (it is run in an empty temporary folder).
+
+Usage: python benchmarks/bench_startup.py [repetitions]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Name and Python code of each measurement
+CASES=[('python (empty)', 'pass'),
+       ('import paleoconv', 'import paleoconv'),
+       ('import paleoconv.pipeline', 'import paleoconv.pipeline'),
+       ('import paleoconv.tdt', 'import paleoconv.tdt'),
+       ('2G_2_all_v2024.py --help', None),
+       ('RS3_2_TDT_v2024.py --help', None)]
+
+# Modules that only the conversion paths that need NumPy can import
+LIBRARIES=['paleoconv', 'paleoconv.pipeline', 'paleoconv.tdt', 'paleoconv.dat2g',
+           'paleoconv.asci', 'paleoconv.rs3', 'paleoconv.utrecht', 'paleoconv.batch',
+           'paleoconv.manifest', 'paleoconv.timestamps', 'paleoconv.catalog',
+           'paleoconv.overlap', 'paleoconv.preflight', 'paleoconv.specimen']
+
+
+def command(name, code):
+    """
+    Command line of a measurement
+    """
+    
+    if code is None:
+        script=name.split()[0]
+        return [sys.executable, os.path.join(ROOT, script), '--help']
+    return [sys.executable, '-c', code]
+
+
+def startup(cmd, folder, env, repetitions):
+    """
+    Median and minimum time (ms) of 'repetitions' runs of 'cmd'
+    """
+    
+    times=[]
+    for i in range(repetitions):
+        t0=time.perf_counter()
+        subprocess.run(cmd, cwd=folder, env=env, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter()-t0)*1000)
+    
+    return statistics.median(times), min(times)
+
+
+def check_imports(folder, env):
+    """
+    Imports the library modules in 'folder' and checks that NumPy is not
+    imported, that nothing is printed and that no file is written
+    """
+    
+    code=('import sys\n'
+          + ''.join(f'import {module}\n' for module in LIBRARIES)
+          + "print('numpy' in sys.modules)")
+    out=subprocess.run([sys.executable, '-c', code], cwd=folder, env=env, check=True,
+                       capture_output=True, text=True)
+    assert out.stdout=='False\n', f'NumPy imported or output at import time: {out.stdout!r}'
+    assert os.listdir(folder)==[], f'Files written at import time: {os.listdir(folder)}'
+
+
+if __name__=='__main__':
+    repetitions=int(sys.argv[1]) if len(sys.argv)>1 else 20
+    
+    env=dict(os.environ)
+    env['PYTHONPATH']=os.path.abspath(ROOT)+os.pathsep+env.get('PYTHONPATH', '')
+    
+    with tempfile.TemporaryDirectory() as folder:
+        check_imports(folder, env)
+        print('Imports without NumPy and without side effects: OK\n')
+    
+        print(f'{"":28}{"median":>10}{"min":>10}   ms ({repetitions} runs)')
+        for name, code in CASES:
+            median, fastest=startup(command(name, code), folder, env, repetitions)
+            print(f'{name:28}{median:10.1f}{fastest:10.1f}')
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Throughput of the converters on synthetic corpora (see make_corpus.py):
+files/s, steps/s and peak memory of each converter for 100, 10 000 and
+100 000 files.
+
+Each measurement runs in a new process, so the peak memory (maximum resident
+size, of the process and of its workers with --jobs) is the one of that
+converter alone. The corpora are written in a temporary folder, or in
+--workdir, where they are kept and reused in the next runs.
+
+Usage: python benchmarks/bench_throughput.py [--sizes 100,10000,100000]
+           [--converters asc,rs3,th,all,tdt,tdt-dat] [--jobs N] [--workdir DIR] [--json FILE]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+# Converter: formats of paleoconv.pipeline, None for RS3_2_TDT, or 'dat' for
+# RS3_2_TDT --from-dat (the *.tdt files made directly from the *.dat files)
+CONVERTERS={'asc': ('asc',), 'rs3': ('rs3',), 'th': ('th',), 'all': ('asc', 'rs3', 'th'),
+            'tdt': None, 'tdt-dat': 'dat'}
+SIZES=(100, 10000, 100000)
+
+
+def peak_memory():
+    """
+    Peak resident memory (MB) of this process and of its finished workers
+    """
+    
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    scale=1024*1024 if sys.platform=='darwin' else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)/scale
+
+
+def run_converter(name, folder, jobs):
+    """
+    Converts all the files of 'folder' with the converter 'name' (in this
+    process) and writes the time and the peak memory, in JSON, to stderr
+    """
+    
+    from functools import partial
+    from paleoconv import pipeline, tdt
+    from paleoconv.batch import run_batch
+    
+    # Positions of the checks of the Thellier corpus
+    with open(os.path.join(folder, 'corpus.json')) as f:
+        checks=json.load(f)['checks']
+    
+    t0=time.perf_counter()
+    if CONVERTERS[name] is None:
+        run_batch(partial(tdt.tdt_file, checks_pos=checks, lab_field='40.0'),
+                  tdt.filename(folder), jobs)
+    elif CONVERTERS[name]=='dat':
+        run_batch(partial(tdt.tdt_file, checks_pos=checks, lab_field='40.0'),
+                  tdt.filename(folder, ext='.dat'), jobs)
+    else:
+        pipeline.convert(pipeline.filename(folder), CONVERTERS[name], jobs, folder=folder)
+    seconds=time.perf_counter()-t0
+    
+    sys.stderr.write(json.dumps({'seconds': seconds, 'peak_mb': peak_memory()})+'\n')
+
+
+def corpus(workdir, n_files, rs3, thellier=False):
+    """
+    Folder with a corpus of n_files *.dat files (or *.rs3 files of Thellier
+    experiments, or *.dat files of Thellier experiments if 'thellier'),
+    written if it does not exist yet
+    Output:
+        folder, number of steps
+    """
+    
+    from make_corpus import write_corpus, THELLIER_CHECKS
+    
+    kind='rs3' if rs3 else 'thellier' if thellier else 'dat'
+    folder=os.path.join(workdir, f'{kind}_{n_files}')
+    index=os.path.join(folder, 'corpus.json')
+    if os.path.exists(index):
+        with open(index) as f:
+            return folder, json.load(f)['steps']
+    
+    t0=time.perf_counter()
+    n_steps=write_corpus(folder, n_files, seed=n_files, thellier=rs3 or thellier, rs3=rs3)
+    with open(index, 'w') as f:
+        json.dump({'files': n_files, 'steps': n_steps,
+                   'checks': list(THELLIER_CHECKS) if rs3 or thellier else None}, f)
+    print(f'  corpus of {n_files} *.{"rs3" if rs3 else "dat"} files written in '
+          f'{time.perf_counter()-t0:.1f} s')
+    
+    return folder, n_steps
+
+
+def measure(name, folder, jobs):
+    """
+    Runs a converter in a new process. Output: seconds, peak memory (MB)
+    """
+    
+    out=subprocess.run([sys.executable, os.path.abspath(__file__), '--run', name, folder,
+                        '--jobs', str(jobs)], stdout=subprocess.DEVNULL,
+                       stderr=subprocess.PIPE, text=True)
+    if out.returncode!=0:
+        raise RuntimeError(f'{name} failed:\n{out.stderr}')
+    result=json.loads(out.stderr.strip().splitlines()[-1])
+    
+    return result['seconds'], result['peak_mb']
+
+
+def benchmark(sizes, converters, jobs, workdir):
+    """
+    Measures each converter with each size of corpus
+    Output:
+        List of dictionaries with the results
+    """
+    
+    results=[]
+    print(f'{"converter":10}{"files":>9}{"steps":>10}{"s":>9}{"files/s":>10}'
+          f'{"steps/s":>11}{"peak MB":>9}')
+    for n_files in sizes:
+        for name in converters:
+            folder, n_steps=corpus(workdir, n_files, rs3=CONVERTERS[name] is None,
+                                   thellier=CONVERTERS[name]=='dat')
+            seconds, peak_mb=measure(name, folder, jobs)
+            results.append({'converter': name, 'files': n_files, 'steps': n_steps,
+                            'jobs': jobs, 'seconds': seconds, 'files_per_s': n_files/seconds,
+                            'steps_per_s': n_steps/seconds, 'peak_mb': peak_mb})
+            print(f'{name:10}{n_files:9d}{n_steps:10d}{seconds:9.2f}{n_files/seconds:10.0f}'
+                  f'{n_steps/seconds:11.0f}{peak_mb:9.1f}')
+    
+    return results
+
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Throughput of the converters')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                        help='numbers of files, separated by commas')
+    parser.add_argument('--converters', default=','.join(CONVERTERS),
+                        help=f'converters to measure ({",".join(CONVERTERS)})')
+    parser.add_argument('-j', '--jobs', type=int, default=1)
+    parser.add_argument('--workdir', default=None,
+                        help='folder where the corpora are written and kept between runs')
+    parser.add_argument('--json', default=None, help='saves the results in this file')
+    parser.add_argument('--run', nargs=2, metavar=('CONVERTER', 'FOLDER'), help=argparse.SUPPRESS)
+    args=parser.parse_args()
+    
+    if args.run:
+        run_converter(args.run[0], args.run[1], args.jobs)
+        sys.exit()
+    
+    sizes=[int(n) for n in args.sizes.split(',')]
+    converters=[name.strip() for name in args.converters.split(',')]
+    for name in converters:
+        if name not in CONVERTERS:
+            parser.error(f'unknown converter {name!r}')
+    
+    if args.workdir is None:
+        with tempfile.TemporaryDirectory() as workdir:
+            results=benchmark(sizes, converters, args.jobs, workdir)
+    else:
+        results=benchmark(sizes, converters, args.jobs, args.workdir)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Generator of synthetic 2G *.dat files, and of the *.rs3 files of Thellier
+experiments used by RS3_2_TDT, for the benchmarks.
+
+The *.dat files follow the layout read by paleoconv.dat2g (header fields at
+their offsets, steps starting with 0xCD and 26 fields separated by 0x00).
+The moments are random, and the specimen, geographic and tilt corrected
+directions are computed from them and from the orientation of the header,
+so the files also pass --check. Requires NumPy.
+
+Usage: python benchmarks/make_corpus.py FOLDER N [--seed S] [--thellier] [--rs3]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from paleoconv.dat2g import (NAME_POS, VOL_POS, GM_POS, DATE_POS, AZ_POS, PL_POS,
+                             DD_POS, DIP_POS, OVER_POS, STEP_MARK, FIELD_SEP)
+from paleoconv.orientation import batch_directions
+from paleoconv.rs3 import format_RS3, write_RS3
+
+
+HEADER_SIZE=140
+MONTHS=('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Steps of the Thellier experiments: temperatures (written in the step names
+# in tens of degrees, followed by the code 0, 1 or 2 of the measurement), and
+# positions (1 = first row without the NRM) of the pTRM checks
+THELLIER_TEMPS=(100, 150, 200, 250, 300, 350, 400, 450, 500, 520, 540, 560)
+THELLIER_CHECKS=(6, 12, 18)
+
+
+def demag_steps(rng, thermal):
+    """
+    Names of the steps of a thermal or AF demagnetization
+    """
+    
+    n=rng.randint(1, 20)
+    if thermal:
+        return ['NRM']+[f'{100+25*i}C' for i in range(1, n)]
+    return ['NRM']+[f'{5*i}.0mT' for i in range(1, n)]
+
+
+def thellier_steps():
+    """
+    Names of the steps of a Thellier experiment, with the checks (steps
+    ending in 2) measured at the end. Output: names, positions of the checks
+    """
+    
+    steps=['NRM']
+    for temp in THELLIER_TEMPS:
+        steps+=[f'{temp//10}0C', f'{temp//10}1C']
+    checks=[f'{THELLIER_TEMPS[2*i]//10}2C' for i in range(len(THELLIER_CHECKS))]
+    
+    return steps+checks, list(THELLIER_CHECKS)
+
+
+def specimen(rng, name, steps):
+    """
+    Header and steps of one specimen, as decoded by paleoconv.dat2g
+    (lists of text fields). The directions agree with X/Y/Z
+    """
+    
+    az, pl, dd, dip=rng.randint(0, 359), rng.randint(0, 90), rng.randint(0, 359), rng.randint(0, 90)
+    over=rng.random()<0.1
+    n=len(steps)
+    
+    m=np.array([rng.uniform(1e-8, 1e-4) for i in range(n)])
+    dec=np.array([rng.uniform(0, 360) for i in range(n)])
+    inc=np.array([rng.uniform(-90, 90) for i in range(n)])
+    rad_dec, rad_inc=np.radians(dec), np.radians(inc)
+    x=m*np.cos(rad_inc)*np.cos(rad_dec)
+    y=m*np.cos(rad_inc)*np.sin(rad_dec)
+    z=m*np.sin(rad_inc)
+    dge, ige, dtc, itc=batch_directions(dec, inc, np.zeros(n, dtype=int), np.array([az]),
+                                        np.array([pl]), np.array([dd]), np.array([dip]),
+                                        np.array([over]), decimals=1)
+    
+    vol=rng.uniform(8, 12)
+    year=rng.randint(2015, 2024)
+    month=MONTHS[rng.randint(0, 11)]
+    day=rng.randint(1, 28)
+    header=[name, f'{vol:.1f}', rng.random()<0.2, az, pl, dd, dip, over,
+            f'{month} {day:02d} {year} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}']
+    
+    data=[]
+    for i, step in enumerate(steps):
+        noise=[f'{rng.uniform(-1e-9, 1e-9):.4E}' for j in range(3)]
+        time=f'{month} {day:02d} {year} {(10+i//60)%24:02d}:{i%60:02d}:{rng.randint(0, 59):02d}'
+        data.append([step, f'{dec[i]:.1f}', f'{inc[i]:.1f}', f'{dge[i]:.1f}', f'{ige[i]:.1f}',
+                     f'{dtc[i]:.1f}', f'{itc[i]:.1f}', f'{m[i]:.3E}', f'{m[i]/(vol*1e-6):.3E}',
+                     f'{x[i]:.4E}', *noise, f'{y[i]:.4E}', *noise, f'{z[i]:.4E}', *noise,
+                     f'{rng.uniform(0, 50):.2f}', f'{rng.uniform(0, 5):.2f}',
+                     f'{rng.uniform(0, 50):.2f}', 'x', time])
+    
+    return header, data
+
+
+def dat_bytes(header, data):
+    """
+    Content of the *.dat file of a specimen (output of specimen)
+    """
+    
+    buf=bytearray(HEADER_SIZE)
+    for pos, value in ((NAME_POS, header[0]), (VOL_POS, header[1]), (DATE_POS, header[8]),
+                       (AZ_POS, header[3]), (PL_POS, header[4]), (DD_POS, header[5]),
+                       (DIP_POS, header[6])):
+        value=str(value).encode('ascii')
+        buf[pos:pos+len(value)]=value
+    buf[GM_POS]=header[2]
+    buf[OVER_POS]=header[7]
+    
+    for dato in data:
+        buf+=STEP_MARK+FIELD_SEP.join(value.encode('ascii') for value in dato)+FIELD_SEP*2
+    
+    return bytes(buf)
+
+
+def write_corpus(folder, n_files, seed=0, thellier=False, rs3=False):
+    """
+    Writes n_files synthetic specimens in 'folder'
+    
+    Input:
+        folder: output folder (created if needed)
+        n_files: number of specimens
+        seed: seed of the random numbers (the same seed gives the same files)
+        thellier: Thellier experiments instead of thermal and AF demagnetizations
+        rs3: writes *.rs3 files (as written by 2G_2_rs3) instead of *.dat files
+    Output:
+        Total number of steps
+    """
+    
+    os.makedirs(folder, exist_ok=True)
+    rng=random.Random(seed)
+    n_steps=0
+    for k in range(n_files):
+        name=f'S{k:07d}'
+        if thellier:
+            steps, checks=thellier_steps()
+        else:
+            steps=demag_steps(rng, thermal=k%2==0)
+        header, data=specimen(rng, name, steps)
+        if rs3:
+            write_RS3(list(format_RS3(header, data)), os.path.join(folder, name+'.rs3'))
+        else:
+            with open(os.path.join(folder, name+'.dat'), 'wb') as f:
+                f.write(dat_bytes(header, data))
+        n_steps+=len(data)
+    
+    return n_steps
+
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Writes synthetic 2G *.dat (or *.rs3) files')
+    parser.add_argument('folder')
+    parser.add_argument('n', type=int, help='number of files')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--thellier', action='store_true',
+                        help='Thellier experiments (checks after the measurements '
+                             f'{",".join(map(str, THELLIER_CHECKS))})')
+    parser.add_argument('--rs3', action='store_true', help='write *.rs3 files instead of *.dat')
+    args=parser.parse_args()
+    
+    n_steps=write_corpus(args.folder, args.n, args.seed, args.thellier, args.rs3)
+    print(f'{args.n} files with {n_steps} steps written in {args.folder}')
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Shared code for the paleomagnetic format converters.
+
+The scripts in the root folder (2G_2_asci, 2G_2_rs3, 2G_2_Utrecht, RS3_2_TDT)
+import their common parts from here.
+"""
+
+# Version of the converters. It is saved in the manifest of the incremental
+# mode, so it has to be changed when the output of the formatters changes
+__version__='2024.1'
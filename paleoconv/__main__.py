@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+python -m paleoconv [folder] [options]: converts the 2G *.dat files of the
+folder, as 2G_2_all_v2024.py (see paleoconv.pipeline.main)
+"""
+
+from paleoconv.pipeline import main
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Reading of the input files from zip/tar archives, and writing of the
+output files into an archive.
+
+The members of the input archive are read one after the other, without
+extracting them to the disk (a compressed tar is read as a stream). The
+outputs are written through a "sink": a folder, or an archive where each
+output is added as a member as soon as it is ready.
+"""
+
+import io
+import os
+import time
+
+from paleoconv.scan import selected, matches
+
+
+ZIP_EXTENSIONS=('.zip',)
+TAR_EXTENSIONS={'.tar': '', '.tar.gz': 'gz', '.tgz': 'gz', '.tar.bz2': 'bz2', '.tbz2': 'bz2',
+                '.tar.xz': 'xz', '.txz': 'xz'}
+
+
+def _tar_compression(path):
+    """
+    Compression of a tar archive ('', 'gz', 'bz2' or 'xz'), or None if
+    'path' is not a tar archive
+    """
+    
+    name=path.lower()
+    for ext, compression in TAR_EXTENSIONS.items():
+        if name.endswith(ext):
+            return compression
+    return None
+
+
+def is_archive(path):
+    """
+    True if 'path' has the extension of a zip or tar archive
+    """
+    
+    return path.lower().endswith(ZIP_EXTENSIONS) or _tar_compression(path) is not None
+
+
+def archive_stem(path):
+    """
+    Name of the archive without its extension (e.g. 'session.tar.gz' -> 'session')
+    """
+    
+    name=path
+    for ext in ZIP_EXTENSIONS+tuple(TAR_EXTENSIONS):
+        if name.lower().endswith(ext):
+            return name[:-len(ext)]
+    return name
+
+
+def member_path(name):
+    """
+    Name of a member as a relative path that cannot go out of the output
+    folder: absolute parts, drive letters and '..' are removed, as
+    zipfile does when it extracts a member (e.g. '../../a.dat' -> 'a.dat')
+    """
+    
+    parts=name.replace('\\', '/').split('/')
+    if parts and parts[0][1:2]==':':
+        parts[0]=parts[0][2:]
+    return '/'.join(part for part in parts if part not in ('', '.', '..'))
+
+
+def member_selected(name, include=(), exclude=()):
+    """
+    True if the member is selected by the globs and none of its folders is excluded
+    """
+    
+    if exclude:
+        parts=name.split('/')[:-1]
+        if any(matches('/'.join(parts[:i]), exclude) for i in range(1, len(parts)+1)):
+            return False
+    return selected(name, include, exclude)
+
+
+def iter_members(archive, ext, include=(), exclude=()):
+    """
+    Reads the members of an archive with the extension 'ext'
+    
+    Input:
+        archive: path of the zip or tar archive
+        ext: extension of the members (e.g. '.dat')
+        include, exclude: globs of the members (see paleoconv.scan)
+    Yields:
+        (name of the member, content in bytes), in the order of the archive.
+        The name is a safe relative path (see member_path)
+    """
+    
+    if archive.lower().endswith(ZIP_EXTENSIONS):
+        import zipfile
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                name=member_path(info.filename)
+                if (not info.is_dir() and name.endswith(ext) and
+                        member_selected(name, include, exclude)):
+                    yield name, zf.read(info)
+    else:
+        import tarfile
+        # Stream mode: the archive is read (and decompressed) only once, from the start
+        with tarfile.open(archive, 'r|'+(_tar_compression(archive) or '*')) as tar:
+            for member in tar:
+                name=member_path(member.name)
+                if (member.isfile() and name.endswith(ext) and
+                        member_selected(name, include, exclude)):
+                    yield name, tar.extractfile(member).read()
+
+
+class FolderSink:
+    """
+    Writes the outputs as files under the folder 'root'. The names of the
+    outputs are relative to 'root', with '/' as separator
+    """
+    
+    def __init__(self, root):
+        self.root=root
+        self.n=0
+    
+    def local_name(self, name):
+        """
+        Path where the output 'name' has to be written. 'name' cannot go
+        out of the root folder (see member_path)
+        """
+        
+        path=os.path.join(self.root, *member_path(name).split('/'))
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        return path
+    
+    def commit(self, path, name):
+        """
+        Called when the file written in local_name(name) is complete
+        """
+        
+        self.n+=1
+    
+    def label(self, name):
+        """
+        Name of the output 'name' in the messages
+        """
+        
+        return os.path.join(self.root, *member_path(name).split('/'))
+    
+    def write(self, name, text, encoding=None):
+        """
+        Writes the text of the output 'name'. Output: number of characters
+        """
+        
+        with open(self.local_name(name), 'w', encoding=encoding) as f:
+            n_chars=f.write(text)
+        self.n+=1
+        return n_chars
+    
+    def close(self):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArchiveSink(FolderSink):
+    """
+    Writes the outputs as members of a zip or tar archive. The files that
+    are written by other functions (e.g. the Utrecht files) are written in
+    a temporary folder and added to the archive by commit()
+    """
+    
+    def __init__(self, path):
+        import tempfile
+        super().__init__(tempfile.mkdtemp(prefix='paleoconv_'))
+        self.path=path
+        self._zip=self._tar=None
+        # The archive is written with another name and renamed when it is
+        # complete, so an interrupted run does not leave a broken archive
+        self._tmp_path=path+'.part'
+        if path.lower().endswith(ZIP_EXTENSIONS):
+            import zipfile
+            self._zip=zipfile.ZipFile(self._tmp_path, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            import tarfile
+            self._tar=tarfile.open(self._tmp_path, 'w:'+_tar_compression(path))
+    
+    def _add(self, name, data):
+        name=member_path(name)
+        if self._zip is not None:
+            self._zip.writestr(name, data)
+        else:
+            import tarfile
+            info=tarfile.TarInfo(name)
+            info.size=len(data)
+            info.mtime=time.time()
+            self._tar.addfile(info, io.BytesIO(data))
+        self.n+=1
+    
+    def commit(self, path, name):
+        with open(path, 'rb') as f:
+            self._add(name, f.read())
+        os.remove(path)
+    
+    def label(self, name):
+        return f'{self.path}:{name}'
+    
+    def write(self, name, text, encoding=None):
+        import locale
+        self._add(name, text.encode(encoding or locale.getpreferredencoding(False)))
+        return len(text)
+    
+    def close(self):
+        """
+        Completes the archive. Nothing is kept if the archive is not complete
+        """
+        
+        if self._zip is None and self._tar is None:
+            return
+        archive=self._zip or self._tar
+        self._zip=self._tar=None
+        archive.close()
+        os.replace(self._tmp_path, self.path)
+        self._remove_root()
+    
+    def _remove_root(self):
+        import shutil
+        shutil.rmtree(self.root, ignore_errors=True)
+    
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            archive=self._zip or self._tar
+            self._zip=self._tar=None
+            if archive is not None:
+                archive.close()
+                os.remove(self._tmp_path)
+            self._remove_root()
+
+
+def open_sink(path):
+    """
+    ArchiveSink if 'path' is an archive, FolderSink otherwise
+    """
+    
+    return ArchiveSink(path) if is_archive(path) else FolderSink(path)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+2G ASCII (*.asc) output, similar to the one of the original 2G program.
+"""
+
+# Column names of the two headers
+HEADER_COLUMNS=['NAME', 'SIZE', 'CC', 'GM', 'CA', 'CP', 'DA', 'DP', 'Overturned', 'FA', 'FP', 'MD', 'TIME','noCOMMENT']
+STEP_COLUMNS=['#', 'DEMAG', 'CD', 'CI', 'ISD', 'ISI', 'RD', 'RI', 'M', 'J', 'X', 'SX', 
+              'NX', 'EX', 'Y', 'SY', 'NY', 'EY', 'Z', 'SZ', 'NZ', 'EZ', 'S/N', 'S/D', 'S/H']
+
+
+def asci_header(header, n_steps):
+    """
+    First rows of the *.asc file: number of steps, header of the
+    specimen and names of the columns of the steps
+    """
+    
+    # Collecting sample data from the first header
+    name=header[0]
+    vol=header[1]
+    cc=header[2]
+    gm=header[3]
+    coreA=header[4]
+    coreP=header[5]
+    dipA=header[6]
+    dipP=header[7]
+    over=header[8]
+    time=header[9]
+    
+    out_l=[name, vol, cc, gm, coreA, coreP, dipA, dipP, over, 0, 0, 0, time]
+    
+    return [[n_steps], HEADER_COLUMNS, out_l, STEP_COLUMNS]
+
+
+def asci_step(i, dato):
+    """
+    Row of the step number 'i' (starting at 1)
+    """
+    
+    return [i]+dato
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Runs the conversion of many files in parallel, using a pool of processes.
+"""
+
+from collections import deque
+from contextlib import redirect_stdout
+from functools import partial
+import io
+from itertools import islice
+import os
+import sys
+
+
+def n_jobs(jobs):
+    """
+    Number of processes to use. 0 or a negative value means
+    one process per CPU
+    """
+    
+    if jobs is None:
+        return 1
+    if jobs<=0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _captured(func, item):
+    """
+    Runs func(item) in a worker. Its messages are returned with the result
+    and printed by the main process (see _shown), in the order of the items,
+    so that the messages of several workers are not mixed. If func fails,
+    they are printed at once, in a single write
+    """
+    
+    messages=io.StringIO()
+    try:
+        with redirect_stdout(messages):
+            result=func(item)
+    except BaseException:
+        sys.stdout.write(messages.getvalue())
+        sys.stdout.flush()
+        raise
+    
+    return result, messages.getvalue()
+
+
+def _shown(output):
+    """
+    Prints the messages of a worker (output of _captured) and gives its result
+    """
+    
+    result, messages=output
+    if messages:
+        sys.stdout.write(messages)
+    return result
+
+
+def run_batch(func, items, jobs=1):
+    """
+    Applies 'func' to each element of 'items'
+    
+    Input:
+        func: function of one argument, defined at module level
+            (it has to be sent to the worker processes)
+        items: list with the arguments (e.g. the names of the files)
+        jobs: number of processes. With 1 everything runs in this process
+    Output:
+        List with the results, in the same order as 'items'
+    """
+    
+    jobs=n_jobs(jobs)
+    if jobs==1 or len(items)<2:
+        return [func(item) for item in items]
+    
+    # Imported here: the pool is only needed with several processes and
+    # concurrent.futures takes longer to import than the rest of the converters
+    from concurrent.futures import ProcessPoolExecutor
+    
+    # Several files per task, so that the workers are not waiting for the pool
+    chunk=max(1, len(items)//(jobs*4))
+    sys.stdout.flush()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return [_shown(output) for output in pool.map(partial(_captured, func), items,
+                                                      chunksize=chunk)]
+
+
+def iter_batch(func, items, jobs=1, ahead=4):
+    """
+    Same as run_batch, but the results are given one at a time, in the
+    order of 'items', as soon as they are ready. Only jobs*ahead items are
+    sent to the pool in advance, so the memory does not depend on the
+    number of items. 'items' can also be an iterator (e.g. a generator that
+    reads the files one after the other)
+    """
+    
+    jobs=n_jobs(jobs)
+    if jobs==1 or (hasattr(items, '__len__') and len(items)<2):
+        for item in items:
+            yield func(item)
+        return
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    items=iter(items)
+    sys.stdout.flush()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending=deque(pool.submit(_captured, func, item) for item in islice(items, jobs*ahead))
+        while pending:
+            result=_shown(pending.popleft().result())
+            for item in islice(items, 1):
+                pending.append(pool.submit(_captured, func, item))
+            yield result
+
+
+def add_jobs_argument(parser):
+    """
+    Adds the --jobs option to an argparse parser
+    """
+    
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of processes used for the conversion '
+                             '(0 = one per CPU, default 1)')
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Catalog of the specimens of a folder tree, in a SQLite file.
+
+For each *.dat file it keeps the header fields decoded by conv (name,
+volume, cc/gm, az, pl, dd, dip, overturned, date), the number of steps,
+the type of demagnetization and the size and modification time of the file.
+The catalog is updated incrementally: only the files that are new or have
+changed are read again. It can be queried with SQL conditions, e.g.
+"folder GLOB 'siteX*' AND time>='2019-06-01' AND dip>60", and the 2G
+scripts can convert only the files selected by a query (--query).
+
+Usage:
+    python -m paleoconv.catalog update [folder] [-r] [--include GLOB] [--exclude GLOB]
+    python -m paleoconv.catalog query [WHERE] [--name GLOB] [--folder GLOB]
+        [--after DATE] [--before DATE] [--demag TYPE] [--paths]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+from paleoconv.dat2g import read_dat, decode_header, Steps
+from paleoconv.batch import iter_batch, add_jobs_argument
+from paleoconv.manifest import file_state
+from paleoconv.timestamps import parse_time
+from paleoconv.specimen import demag_type
+
+
+CATALOG_FILE='paleoconv_catalog.sqlite'
+# Version of the table. The catalog is built again when it changes
+CATALOG_VERSION=1
+
+# Columns of the table: name and SQL type
+COLUMNS=[('path', 'TEXT PRIMARY KEY'),   # relative to the folder of the catalog, '/' separated
+         ('folder', 'TEXT'),             # folder of the file ('' for the first one)
+         ('file', 'TEXT'),
+         ('name', 'TEXT'),
+         ('vol', 'REAL'),
+         ('cc', 'INTEGER'), ('gm', 'INTEGER'),
+         ('az', 'REAL'), ('pl', 'REAL'), ('dd', 'REAL'), ('dip', 'REAL'),
+         ('over', 'INTEGER'),
+         ('date', 'TEXT'),               # as in the header: 'Nov 05 2019 15:12'
+         ('time', 'TEXT'),               # the same date as 'YYYY-MM-DD HH:MM:SS'
+         ('n_steps', 'INTEGER'),
+         ('demag', 'TEXT'),              # 'thermal', 'AF' or 'NRM' (last step)
+         ('last_step', 'TEXT'),
+         ('size', 'INTEGER'),
+         ('mtime', 'INTEGER')]           # ns
+NAMES=[name for name, sql_type in COLUMNS]
+
+# Columns printed by the query command
+SHOWN=('name', 'date', 'demag', 'n_steps', 'az', 'pl', 'dd', 'dip', 'path')
+
+
+def _number(value):
+    """
+    float(value), or None if the field is not a number
+    """
+    
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def catalog_entry(item):
+    """
+    Row of the catalog of one file
+    
+    Input:
+        item: (path of the file, path relative to the folder of the catalog)
+    Output:
+        tuple with the values of COLUMNS
+    """
+    
+    file, rel=item
+    # The state is taken before reading, as in the incremental conversion
+    size, mtime=file_state(file)
+    buf=read_dat(file)
+    name, vol, cc, gm, az, pl, dd, dip, over, date=decode_header(buf)
+    steps=Steps(buf)
+    last=steps[-1] if len(steps)>0 else None
+    last_step=last[0] if last else None
+    time=parse_time(date)
+    
+    folder, _, base=rel.rpartition('/')
+    return (rel, folder, base, name, _number(vol), cc, gm, _number(az), _number(pl),
+            _number(dd), _number(dip), over, date,
+            time.isoformat(' ') if time is not None else None,
+            len(steps), demag_type(last_step), last_step, size, mtime)
+
+
+def _catalog_row(item):
+    """
+    catalog_entry for iter_batch. Output: the row, or None and the error if
+    the file cannot be read
+    """
+    
+    try:
+        return catalog_entry(item), None
+    except Exception as error:
+        return None, f'{type(error).__name__}: {error}'
+
+
+def open_catalog(path=CATALOG_FILE):
+    """
+    Opens the catalog, and creates its table if it does not exist
+    (or was created by another version)
+    """
+    
+    con=sqlite3.connect(path)
+    if con.execute('PRAGMA user_version').fetchone()[0]!=CATALOG_VERSION:
+        con.execute('DROP TABLE IF EXISTS specimens')
+        con.execute('CREATE TABLE specimens ('+
+                    ', '.join(f'{name} {sql_type}' for name, sql_type in COLUMNS)+')')
+        for name in ('folder', 'name', 'time'):
+            con.execute(f'CREATE INDEX specimens_{name} ON specimens ({name})')
+        con.execute(f'PRAGMA user_version={CATALOG_VERSION}')
+        con.commit()
+    
+    return con
+
+
+def _root(path):
+    return os.path.dirname(path) or '.'
+
+
+def _relative(file, root):
+    return os.path.relpath(file, root).replace(os.sep, '/')
+
+
+def update_catalog(path, files, jobs=1):
+    """
+    Adds to the catalog the files that are new or have changed, and removes
+    the files of the catalog that do not exist any more
+    
+    Input:
+        path: catalog file. The paths of the files are kept relative to its folder
+        files: *.dat files (e.g. output of paleoconv.pipeline.filename)
+        jobs: number of processes that read the files
+    Output:
+        number of files added or updated, number of files removed, total,
+        and list of (file, error) of the files that could not be read. They
+        are left out of the catalog, and read again in the next update
+    """
+    
+    root=_root(path)
+    con=open_catalog(path)
+    try:
+        known={rel: (size, mtime) for rel, size, mtime
+               in con.execute('SELECT path, size, mtime FROM specimens')}
+        
+        items=[]
+        seen=set()
+        for file in files:
+            rel=_relative(file, root)
+            seen.add(rel)
+            try:
+                state=file_state(file)
+            except OSError:
+                continue
+            if known.get(rel)!=state:
+                items.append((file, rel))
+        
+        failed=[]
+        
+        def rows():
+            for (file, rel), (row, error) in zip(items, iter_batch(_catalog_row, items, jobs)):
+                if error is not None:
+                    print(f'Error!!! {file} could not be added to the catalog: {error}')
+                    failed.append((file, rel, error))
+                    continue
+                yield row
+        
+        con.executemany(f'INSERT OR REPLACE INTO specimens VALUES ({",".join("?"*len(NAMES))})',
+                        rows())
+        # The rows of the files that have changed and cannot be read any more
+        con.executemany('DELETE FROM specimens WHERE path=?', [(rel,) for file, rel, error in failed])
+        
+        missing=[(rel,) for rel in known if rel not in seen and
+                 not os.path.exists(os.path.join(root, *rel.split('/')))]
+        con.executemany('DELETE FROM specimens WHERE path=?', missing)
+        con.commit()
+        total=con.execute('SELECT COUNT(*) FROM specimens').fetchone()[0]
+    finally:
+        con.close()
+    
+    return (len(items)-len(failed), len(missing), total,
+            [(file, error) for file, rel, error in failed])
+
+
+def query_catalog(path, where='', params=()):
+    """
+    Specimens of the catalog that meet the SQL condition 'where' (all of
+    them if empty), sorted by folder and by name of the file
+    Output:
+        list of sqlite3.Row (values by column name)
+    """
+    
+    con=open_catalog(path)
+    con.row_factory=sqlite3.Row
+    try:
+        return con.execute('SELECT * FROM specimens'+(f' WHERE {where}' if where else '')+
+                           ' ORDER BY folder, file', params).fetchall()
+    finally:
+        con.close()
+
+
+def catalog_files(path, where='', params=()):
+    """
+    Paths of the files selected by query_catalog, as paths that can be opened
+    (relative to the current folder if the catalog path is relative)
+    """
+    
+    root=_root(path)
+    return [os.path.normpath(os.path.join(root, *row['path'].split('/')))
+            for row in query_catalog(path, where, params)]
+
+
+def filters_where(where=None, name=None, folder=None, after=None, before=None, demag=None):
+    """
+    SQL condition and its parameters from the options of the query command
+    """
+    
+    conditions=[f'({where})'] if where else []
+    params=[]
+    for value, condition in ((name, 'name GLOB ?'), (folder, 'folder GLOB ?'),
+                             (after, 'time>=?'), (before, 'time<?'), (demag, 'demag=?')):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    
+    return ' AND '.join(conditions), params
+
+
+def print_rows(rows):
+    """
+    Prints the specimens found by a query as a table
+    """
+    
+    table=[[('' if row[name] is None else str(row[name])) for name in SHOWN] for row in rows]
+    widths=[max([len(name)]+[len(line[i]) for line in table]) for i, name in enumerate(SHOWN)]
+    for line in [list(SHOWN)]+table:
+        print('  '.join(value.ljust(width) for value, width in zip(line, widths)).rstrip())
+    print(len(rows), 'specimens')
+
+
+def main(argv=None):
+    """
+    Command line entry point: update and query commands
+    """
+    
+    from paleoconv.pipeline import filename
+    
+    parser=argparse.ArgumentParser(description='Catalog of the 2G specimens in a SQLite file')
+    commands=parser.add_subparsers(dest='command', required=True)
+    
+    update=commands.add_parser('update', help='add the new and changed *.dat files to the catalog')
+    update.add_argument('folder', nargs='?', default='.',
+                        help='folder with the *.dat files (default: the current folder)')
+    update.add_argument('--db', default=None,
+                        help=f'catalog file (default: {CATALOG_FILE} in the folder)')
+    update.add_argument('-r', '--recursive', action='store_true',
+                        help='also add the *.dat files of all the subfolders')
+    update.add_argument('--include', action='append', default=[], metavar='GLOB')
+    update.add_argument('--exclude', action='append', default=[], metavar='GLOB')
+    add_jobs_argument(update)
+    
+    query=commands.add_parser('query', help='list the specimens that meet the conditions')
+    query.add_argument('where', nargs='?', default=None,
+                       help='SQL condition on the columns of the catalog, e.g. "dip>60 AND cc=1" '
+                            f'(columns: {", ".join(NAMES)})')
+    query.add_argument('--db', default=CATALOG_FILE,
+                       help=f'catalog file (default: {CATALOG_FILE})')
+    query.add_argument('--name', default=None, metavar='GLOB', help='name of the specimen')
+    query.add_argument('--folder', default=None, metavar='GLOB',
+                       help='folder of the file, relative to the catalog (e.g. "2019/site*")')
+    query.add_argument('--after', default=None, metavar='DATE',
+                       help='measured on or after DATE (YYYY-MM-DD [HH:MM])')
+    query.add_argument('--before', default=None, metavar='DATE', help='measured before DATE')
+    query.add_argument('--demag', default=None, choices=('thermal', 'AF', 'NRM'))
+    query.add_argument('--paths', action='store_true',
+                       help='print only the paths of the files, one per line')
+    args=parser.parse_args(argv)
+    
+    if args.command=='update':
+        db=args.db or os.path.join(args.folder, CATALOG_FILE)
+        files=filename(args.folder, True, args.recursive, args.include, args.exclude)
+        n_new, n_removed, total, failed=update_catalog(db, files, args.jobs)
+        print(f'{n_new} files added or updated, {n_removed} removed, {total} specimens in {db}')
+        if failed:
+            print(f'{len(failed)} files could not be read')
+            sys.exit(1)
+        return
+    
+    if not os.path.isfile(args.db):
+        parser.error(f'{args.db} does not exist (run the update command first)')
+    where, params=filters_where(args.where, args.name, args.folder, args.after, args.before,
+                                args.demag)
+    try:
+        if args.paths:
+            for file in catalog_files(args.db, where, params):
+                print(file)
+        else:
+            print_rows(query_catalog(args.db, where, params))
+    except sqlite3.Error as error:
+        parser.error(f'wrong query: {error}')
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Consistency check of the directions stored in the 2G *.dat files.
+
+The specimen (CD/CI), geographic (ISD/ISI) and tilt corrected (RD/RI)
+directions of each step are recomputed from the X/Y/Z moments and the
+orientation of the header (CA/CP/DA/DP/overturned), for all the steps of
+all the files at once, and the specimens whose stored directions differ
+more than a tolerance are reported. A difference only in the geographic
+and tilt corrected directions usually means a wrong CA/CP; a difference
+only in the tilt corrected ones, a wrong DA/DP or overturned flag.
+"""
+
+import numpy as np
+
+from paleoconv.orientation import dir2car, batch_directions
+from paleoconv.store import Collection
+
+
+SYSTEMS=('specimen', 'geographic', 'tilt corrected')
+
+
+def angle(dec1, inc1, dec2, inc2):
+    """
+    Angle (degrees) between two arrays of directions
+    """
+    
+    a=np.stack(dir2car([dec1, inc1]), axis=-1)
+    b=np.stack(dir2car([dec2, inc2]), axis=-1)
+    cross=np.linalg.norm(np.cross(a, b), axis=-1)
+    
+    return np.degrees(np.arctan2(cross, np.sum(a*b, axis=-1)))
+
+
+def check_directions(collection):
+    """
+    Recomputes the directions of every step and compares them with the stored ones
+    
+    Input: paleoconv.store.Collection
+    Output:
+        array (n_steps, 3) with the angle (degrees) between the stored and the
+        recomputed direction, in specimen, geographic and tilt corrected
+        coordinates (NaN if a field is missing)
+    """
+    
+    steps=collection.steps
+    x, y, z=steps['x'], steps['y'], steps['z']
+    dsp=np.degrees(np.arctan2(y, x))%360
+    isp=np.degrees(np.arctan2(z, np.hypot(x, y)))
+    
+    dge, ige, dtc, itc=batch_directions(dsp, isp, collection.index,
+                                        collection.header_column('az'),
+                                        collection.header_column('pl'),
+                                        collection.header_column('dd'),
+                                        collection.header_column('dip'),
+                                        collection.header_column('over'),
+                                        decimals=None)
+    
+    return np.stack([angle(steps['cd'], steps['ci'], dsp, isp),
+                     angle(steps['isd'], steps['isi'], dge, ige),
+                     angle(steps['rd'], steps['ri'], dtc, itc)], axis=-1)
+
+
+def check_files(files, tolerance=2.):
+    """
+    Checks the stored directions of the files
+    
+    Input:
+        files: names of the *.dat files
+        tolerance: maximum angle (degrees) between the stored and the recomputed directions
+    Output:
+        List with (file, specimen name, maximum angle in each coordinate system)
+        for the specimens with any angle above 'tolerance'
+    """
+    
+    collection=Collection.from_files(files)
+    if len(collection.steps)==0:
+        return []
+    diff=check_directions(collection)
+    
+    # Maximum of each specimen, ignoring the missing values
+    worst=np.full((len(collection), 3), np.nan)
+    np.fmax.at(worst, collection.index, diff)
+    flagged=np.flatnonzero(np.any(worst>tolerance, axis=1))
+    
+    return [(collection.specimens[i].file, collection.specimens[i].name, worst[i].tolist())
+            for i in flagged]
+
+
+def print_report(flagged, n_files, tolerance):
+    """
+    Prints the result of check_files
+    """
+    
+    print(f'{len(flagged)} of {n_files} specimens with directions differing more than {tolerance:g}° '
+          'from the ones recomputed from X/Y/Z and the orientation')
+    for file, name, worst in flagged:
+        bad=', '.join(f'{system} {value:.1f}°' for system, value in zip(SYSTEMS, worst)
+                      if value==value and value>tolerance)
+        print(f'  {name} ({file}): {bad}')
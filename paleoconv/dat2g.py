@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Reader for the binary *.dat files written by the 2G cryogenic magnetometer.
+
+Each file is read once into memory and the header fields and the
+demagnetization steps are decoded directly from the bytes.
+"""
+
+import re
+
+# Offsets of the header fields. Text fields end at the first byte
+# that is not printable ASCII
+NAME_POS=15
+VOL_POS=24
+GM_POS=33
+DATE_POS=37
+DATE_LEN=17
+AZ_POS=111
+PL_POS=116
+DD_POS=120
+DIP_POS=125
+OVER_POS=129
+
+STEP_MARK=b'\xcd'
+FIELD_SEP=b'\x00'
+N_FIELDS=26
+
+# Printable ASCII, without the backslash
+_text=re.compile(rb'[\x20-\x5b\x5d-\x7e]*')
+# First field of a step (the fields are separated by one or more null bytes)
+_first_field=re.compile(rb'\x00*([^\x00]*)')
+
+
+def read_dat(file_name):
+    """
+    Reads the whole *.dat file in a single call
+    Output:
+        bytes with the content of the file
+    """
+    
+    with open(file_name, 'rb') as f:
+        return f.read()
+
+
+def _field(buf, pos):
+    """
+    Text field of the header starting at 'pos'
+    """
+    
+    return _text.match(buf, pos).group().decode('ascii')
+
+
+def _flag(buf, pos):
+    """
+    True if the byte at 'pos' is 0x01
+    """
+    
+    return buf[pos:pos+1]==b'\x01'
+
+
+def _text_value(raw, double_quoted):
+    """
+    Converts the bytes of a step field into text. Non printable bytes
+    are kept escaped, as they appear in the repr of the whole file
+    ('double_quoted' is True when that repr uses double quotes)
+    """
+    
+    try:
+        value=raw.decode('ascii')
+    except UnicodeDecodeError:
+        value=None
+    if value is not None and value.isprintable() and '\\' not in value and (double_quoted or "'" not in value):
+        return value
+    if double_quoted:
+        return repr(raw)[2:-1]
+    # Forces the single-quoted repr, where "'" is escaped
+    return repr(b'"'+raw)[3:-1]
+
+
+def decode_header(buf):
+    """
+    Decodes the specimen information from the first bytes of the file
+    
+    Input: content of the *.dat file (bytes or memoryview)
+    Output:
+        header: [name, vol, cc, gm, az, pl, dd, dip, over, date]
+    """
+    
+    # The text fields end at the first byte that is not printable, which can
+    # be after the overturned flag (at the latest, the 0xCD of the first step)
+    if not isinstance(buf, bytes):
+        buf=bytes(buf)
+    
+    name_spec=_field(buf, NAME_POS)
+    vol=_field(buf, VOL_POS)
+    
+    # Mass (gm) or volume (cc) normalization
+    if _flag(buf, GM_POS):
+        gm=1
+        cc=0
+    else:
+        gm=0
+        cc=1
+    
+    date=repr(buf[DATE_POS:DATE_POS+DATE_LEN])[2:-1]
+    
+    az=_field(buf, AZ_POS)
+    pl=_field(buf, PL_POS)
+    dd=_field(buf, DD_POS)
+    dip=_field(buf, DIP_POS)
+    
+    # Normal (0) or overturned (1) bedding
+    over=1 if _flag(buf, OVER_POS) else 0
+    
+    return [name_spec, vol, cc, gm, az, pl, dd, dip, over, date]
+
+
+def _steps_buffer(buf):
+    """
+    Prepares the end of the file as the old parser (based on the repr of
+    the file) saw it
+    Output:
+        buf: bytes
+        double_quoted: True if that repr used double quotes
+    """
+    
+    buf=bytes(buf)
+    
+    # Python writes the repr of bytes with double quotes when they contain
+    # "'" but no '"'. The closing quote is then kept as part of the last field
+    double_quoted=b"'" in buf and b'"' not in buf
+    if double_quoted:
+        buf=buf+b'"'
+    else:
+        buf=buf.rstrip(b"b '")
+    
+    return buf, double_quoted
+
+
+def _decode_block(block, double_quoted):
+    """
+    Fields of one step. They are separated by one or more null bytes
+    """
+    
+    fields=[field for field in block.split(FIELD_SEP) if field][0:N_FIELDS]
+    return [_text_value(field, double_quoted) for field in fields]
+
+
+class Steps:
+    """
+    Demagnetization steps of a *.dat file. Each step starts with 0xCD.
+    
+    The steps are decoded one at a time when iterated, so only one of them
+    is in memory. len() counts the steps without decoding them, and steps[i]
+    decodes only step i (steps[-1] is found from the end of the file).
+    
+    If 'keep' is given (function of the label of the step, e.g. 'NRM' or
+    '100C', that returns True for the steps to keep), only the label of
+    each step is decoded to select them, and the other steps are never decoded.
+    """
+    
+    __slots__=('_buf', '_double_quoted', '_n', '_spans')
+    
+    def __init__(self, buf, keep=None):
+        self._buf, self._double_quoted=_steps_buffer(buf)
+        self._spans=None
+        if keep is None:
+            self._n=self._buf.count(STEP_MARK)
+        else:
+            self._spans=[(start, end) for start, end in self._blocks()
+                         if keep(self._label(start, end))]
+            self._n=len(self._spans)
+    
+    def __len__(self):
+        return self._n
+    
+    def _blocks(self):
+        """
+        (start, end) of the bytes of each step, without the 0xCD
+        """
+        
+        buf=self._buf
+        start=buf.find(STEP_MARK)
+        while start!=-1:
+            end=buf.find(STEP_MARK, start+1)
+            yield start+1, end if end!=-1 else len(buf)
+            start=end
+    
+    def _selected(self):
+        return self._blocks() if self._spans is None else self._spans
+    
+    def _label(self, start, end):
+        """
+        First field (label) of the step in buf[start:end]
+        """
+        
+        return _text_value(_first_field.match(self._buf, start, end).group(1), self._double_quoted)
+    
+    def __iter__(self):
+        buf=self._buf
+        for start, end in self._selected():
+            yield _decode_block(buf[start:end], self._double_quoted)
+    
+    def iter_fields(self, fields):
+        """
+        Iterates the steps decoding only the fields in 'fields' (positions,
+        e.g. (0, 8) for the step and M). The other fields are None
+        """
+        
+        size=max(fields)+1
+        buf=self._buf
+        for start, end in self._selected():
+            raw=[field for field in buf[start:end].split(FIELD_SEP) if field][0:N_FIELDS]
+            dato=[None]*size
+            for i in fields:
+                dato[i]=_text_value(raw[i], self._double_quoted)
+            yield dato
+    
+    def labels(self):
+        """
+        List with the label of each step (e.g. 'NRM', '100C'), without
+        decoding the other fields
+        """
+        
+        return [self._label(start, end) for start, end in self._selected()]
+    
+    def __getitem__(self, i):
+        if i<0:
+            i+=self._n
+        if not 0<=i<self._n:
+            raise IndexError('step index out of range')
+        if self._spans is not None:
+            start, end=self._spans[i]
+            return _decode_block(self._buf[start:end], self._double_quoted)
+        if i==self._n-1:
+            start=self._buf.rfind(STEP_MARK)
+            return _decode_block(self._buf[start+1:], self._double_quoted)
+        for j, dato in enumerate(self):
+            if j==i:
+                return dato
+
+
+def iter_steps(buf):
+    """
+    Generator with the demagnetization steps, decoded one at a time
+    
+    Input: content of the *.dat file (bytes or memoryview)
+    Output:
+        the first 26 fields of each step
+    """
+    
+    return iter(Steps(buf))
+
+
+def decode_steps(buf):
+    """
+    Decodes all the demagnetization steps
+    
+    Input: content of the *.dat file (bytes or memoryview)
+    Output:
+        d_limpio: list with the first 26 fields of each step
+    """
+    
+    return list(iter_steps(buf))
+
+
+def conv(file_name):
+    """
+    Function to convert hexadecimal 2G files into text
+    
+    Input: name of the file to convert
+    Output:
+        header: Specimen info
+        d_limpio: Raw data 
+    """
+    
+    buf=read_dat(file_name)
+    
+    return decode_header(buf), decode_steps(buf)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Manifest of the files already converted, used to convert only the new or
+modified *.dat files when the conversion is repeated in the same folder.
+
+For each *.dat file it keeps the size, the modification time, the hash of
+its content, the version of the converters and the output files written.
+The paths are saved relative to the folder of the manifest, so the same
+folder is recognized from any current folder. In memory they are absolute
+paths (os.path.abspath).
+"""
+
+import hashlib
+import json
+import os
+
+from paleoconv import __version__
+
+
+MANIFEST_FILE='.paleoconv_manifest.json'
+
+
+def _key(file):
+    """
+    Path of a file in the manifest in memory
+    """
+    
+    return os.path.abspath(file)
+
+
+def _saved(path, root):
+    """
+    Path saved in the manifest: relative to its folder, '/' separated
+    """
+    
+    try:
+        return os.path.relpath(path, root).replace(os.sep, '/')
+    except ValueError:
+        # Another drive (Windows): the path is kept as it is
+        return path
+
+
+def _local(path, root):
+    """
+    Path from the current folder of a path saved in the manifest
+    """
+    
+    return _key(os.path.join(root, path.replace('/', os.sep)))
+
+
+def _convert_paths(manifest, convert):
+    """
+    Copy of the manifest with convert(path) applied to all its paths
+    """
+    
+    files={}
+    for file, entry in manifest['files'].items():
+        entry=dict(entry)
+        entry['outputs']={ext: convert(name) for ext, name in entry.get('outputs', {}).items()}
+        files[convert(file)]=entry
+    utrecht=dict(manifest['utrecht'])
+    for field in ('files', 'outputs'):
+        if field in utrecht:
+            utrecht[field]=[convert(name) for name in utrecht[field]]
+    
+    return dict(manifest, files=files, utrecht=utrecht)
+
+
+def load_manifest(path=MANIFEST_FILE):
+    """
+    Reads the manifest. If it does not exist (or cannot be read)
+    an empty one is returned
+    """
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest=json.load(f)
+    except (OSError, ValueError):
+        manifest={}
+    manifest.setdefault('files', {})
+    manifest.setdefault('utrecht', {})
+    root=os.path.dirname(path) or '.'
+    
+    return _convert_paths(manifest, lambda name: _local(name, root))
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    """
+    Writes the manifest. A temporary file is used so that an interrupted
+    run does not leave a broken manifest
+    """
+    
+    root=os.path.dirname(path) or '.'
+    manifest=_convert_paths(manifest, lambda name: _saved(name, root))
+    tmp=path+'.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def file_state(file):
+    """
+    Size and modification time (ns) of a file
+    """
+    
+    st=os.stat(file)
+    return st.st_size, st.st_mtime_ns
+
+
+def content_hash(buf):
+    """
+    Hash of the content of a file
+    """
+    
+    return hashlib.sha1(buf).hexdigest()
+
+
+def file_hash(file):
+    """
+    Hash of the content of the file 'file'
+    """
+    
+    with open(file, 'rb') as f:
+        return content_hash(f.read())
+
+
+def pending_formats(manifest, file, formats, state):
+    """
+    Checks which outputs of a file have to be generated again
+    
+    Input:
+        manifest: output of load_manifest
+        file: name of the *.dat file
+        formats: requested formats
+        state: output of file_state for the file
+    Output:
+        pending: list with the formats whose output is missing or out of date
+        changed: True if the file is new or its content has changed
+            since the last conversion
+    """
+    
+    entry=manifest['files'].get(_key(file))
+    if entry is None or entry.get('version')!=__version__:
+        return list(formats), True
+    
+    if [entry['size'], entry['mtime']]!=list(state):
+        # The modification time can change without changes in the content
+        # (e.g. the file is copied again), so the hash decides
+        if entry['size']!=state[0] or entry.get('hash')!=file_hash(file):
+            return list(formats), True
+        entry['size'], entry['mtime']=state
+    
+    outputs=entry.get('outputs', {})
+    pending=[ext for ext in formats
+             if ext=='th' or ext not in outputs or not os.path.exists(outputs[ext])]
+    # The Utrecht file is checked for the whole folder, not per file
+    if pending==['th']:
+        pending=[]
+    
+    return pending, False
+
+
+def record(manifest, file, state, digest, outputs):
+    """
+    Saves in the manifest the conversion of a file
+    
+    Input:
+        state: output of file_state, taken before reading the file
+        digest: hash of the content that was converted
+        outputs: dictionary format -> name of the output file
+    """
+    
+    file=_key(file)
+    entry=manifest['files'].get(file)
+    if entry is None or entry.get('hash')!=digest or entry.get('version')!=__version__:
+        entry={'outputs': {}}
+        manifest['files'][file]=entry
+    entry['size'], entry['mtime']=state
+    entry['hash']=digest
+    entry['version']=__version__
+    entry['outputs'].update({ext: _key(name) for ext, name in outputs.items()})
+
+
+def forget_missing(manifest, files):
+    """
+    Removes from the manifest the files that are not in 'files'
+    Output:
+        True if any file was removed
+    """
+    
+    files={_key(file) for file in files}
+    missing=[file for file in manifest['files'] if file not in files]
+    for file in missing:
+        del manifest['files'][file]
+    
+    return len(missing)>0
+
+
+def utrecht_up_to_date(manifest, files, split=None):
+    """
+    True if the Utrecht file(s) exist and were written with exactly the
+    specimens in 'files' (in the same order), split in the same way, by
+    this version of the converters
+    """
+    
+    utrecht=manifest['utrecht']
+    return (utrecht.get('files')==[_key(file) for file in files] and utrecht.get('split')==split and
+            utrecht.get('version')==__version__ and len(utrecht.get('outputs', []))>0 and
+            all(os.path.exists(name) for name in utrecht['outputs']))
+
+
+def record_utrecht(manifest, files, outputs, split=None):
+    """
+    Saves in the manifest the specimens written in the Utrecht file(s)
+    """
+    
+    manifest['utrecht']={'outputs': [_key(name) for name in outputs],
+                         'files': [_key(file) for file in files], 'split': split,
+                         'version': __version__}
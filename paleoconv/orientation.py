@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Orientation of the directions: specimen -> geographic -> tilt corrected.
+
+dir2car, car2dir and spe2geo work with one direction. The batch functions
+(geo_matrices, tilt_matrices, rotate_directions) work with the steps of
+many specimens at once: the rotation matrices of each specimen are built
+only once and all the steps are rotated in a single NumPy operation.
+
+Directions are (Dec, Inc) in degrees, in a north-east-down frame.
+"""
+
+import numpy as np
+
+
+def dir2car(dir): 
+    """
+    being 'dir' a list of lists, with pairs of Dec, Inc in degrees
+    converts from geographic to cartesian coordinates
+    (also works with arrays of Dec and Inc)
+    """
+	
+    dec=np.radians(dir[0])
+    inc=np.radians(dir[1])
+    
+    x=np.cos(dec)*np.cos(inc) 
+    y=np.sin(dec)*np.cos(inc) 
+    z=np.sin(inc)                 
+    
+    cart=[x,y,z]
+    
+    # print('Cart: ', cart)
+    return cart
+
+
+def car2dir(cart, decimals=1): 
+    """
+    being 'cart' a list of lists, with x, y, z
+    converts from cartesian to geographic coordinates
+    (also works with arrays of x, y and z)
+    """
+	
+    dec=np.round(np.degrees(np.arctan2(cart[1],cart[0])), decimals)
+    inc=np.round(np.degrees(np.arcsin(np.clip(cart[2], -1., 1.))), decimals)
+    dir=[dec%360,inc]
+	
+    # print('Dir: ', dir)
+    return dir
+
+
+def geo_matrices(az, pl):
+    """
+    Rotation matrices from specimen to geographic coordinates
+    
+    Input:
+        az, pl: azimuth and plunge of each specimen (CA and CP of the 2G header)
+    Output:
+        array (n, 3, 3). Its columns are the specimen axes in geographic coordinates
+    """
+    
+    az=np.atleast_1d(np.asarray(az, dtype=float))
+    pl=np.atleast_1d(np.asarray(pl, dtype=float))
+    
+    mat=np.empty((len(az), 3, 3))
+    mat[:, :, 0]=np.stack(dir2car([az, pl-90.]), axis=-1)
+    mat[:, :, 1]=np.stack(dir2car([az+90., np.zeros_like(az)]), axis=-1)
+    mat[:, :, 2]=np.stack(dir2car([az, pl]), axis=-1)
+    
+    return mat
+
+
+def tilt_matrices(dd, dip, over=None):
+    """
+    Rotation matrices from geographic to tilt corrected coordinates:
+    rotation around the strike of the bed that brings it to horizontal
+    
+    Input:
+        dd, dip: dip direction and dip of the bed of each specimen (DA and DP)
+        over: 1 for overturned beds (they are rotated 180-dip), None if there are none
+    Output:
+        array (n, 3, 3)
+    """
+    
+    dd=np.atleast_1d(np.asarray(dd, dtype=float))
+    dip=np.atleast_1d(np.asarray(dip, dtype=float))
+    if over is not None:
+        dip=np.where(np.atleast_1d(over)==1, 180.-dip, dip)
+    
+    # Strike axis (horizontal, dip direction - 90) and rotation angle (-dip)
+    kx=np.sin(np.radians(dd))
+    ky=-np.cos(np.radians(dd))
+    ang=-np.radians(dip)
+    c=np.cos(ang)
+    s=np.sin(ang)
+    
+    # Rodrigues formula with a horizontal axis (kz=0)
+    mat=np.empty((len(dd), 3, 3))
+    mat[:, 0, 0]=c+kx*kx*(1-c)
+    mat[:, 0, 1]=kx*ky*(1-c)
+    mat[:, 0, 2]=ky*s
+    mat[:, 1, 0]=kx*ky*(1-c)
+    mat[:, 1, 1]=c+ky*ky*(1-c)
+    mat[:, 1, 2]=-kx*s
+    mat[:, 2, 0]=-ky*s
+    mat[:, 2, 1]=kx*s
+    mat[:, 2, 2]=c
+    
+    return mat
+
+
+def rotate_directions(dec, inc, matrices, index, decimals=1):
+    """
+    Rotates the directions of many steps
+    
+    Input:
+        dec, inc: arrays with the direction of each step
+        matrices: array (n, 3, 3) with the rotation of each specimen
+        index: array with the specimen (row of 'matrices') of each step
+        decimals: decimals of the output (None to keep them all)
+    Output:
+        dec, inc: arrays with the rotated directions
+    """
+    
+    car=np.stack(dir2car([np.asarray(dec, dtype=float), np.asarray(inc, dtype=float)]), axis=-1)
+    rot=np.einsum('kij,kj->ki', matrices[np.asarray(index)], car)
+    if decimals is None:
+        dec=np.degrees(np.arctan2(rot[:, 1], rot[:, 0]))%360
+        inc=np.degrees(np.arcsin(np.clip(rot[:, 2], -1., 1.)))
+        return dec, inc
+    
+    return car2dir([rot[:, 0], rot[:, 1], rot[:, 2]], decimals)
+
+
+def specimen_index(n_steps):
+    """
+    Specimen (0, 1, ...) of each step, from the number of steps of each specimen
+    """
+    
+    return np.repeat(np.arange(len(n_steps)), n_steps)
+
+
+def batch_directions(dec, inc, index, az, pl, dd, dip, over=None, decimals=1):
+    """
+    Geographic and tilt corrected directions of the steps of many specimens
+    
+    Input:
+        dec, inc: specimen directions of all the steps
+        index: specimen of each step (see specimen_index)
+        az, pl, dd, dip, over: orientation of each specimen (2G header)
+    Output:
+        dge, ige, dtc, itc: arrays with the directions of each step
+    """
+    
+    geo=geo_matrices(az, pl)
+    tc=np.matmul(tilt_matrices(dd, dip, over), geo)
+    
+    dge, ige=rotate_directions(dec, inc, geo, index, decimals)
+    dtc, itc=rotate_directions(dec, inc, tc, index, decimals)
+    
+    return dge, ige, dtc, itc
+
+
+def spe2geo(dec, inc, az, pl): 
+    """
+    converts from specimen to geographic coordinates
+    """
+    
+    dge, ige=rotate_directions([dec], [inc], geo_matrices(az, pl), [0])
+    
+    return [float(dge[0]), float(ige[0])]
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Overlapped reading, conversion and writing of the files (--io-threads), for
+folders on network shares, where each open()/read() waits for the server.
+
+The files are read by a pool of threads, ahead of the conversion, and the
+outputs are written by another pool of threads while the next files are
+converted (in this process, or in the processes of --jobs). The stages are
+connected by bounded queues: new files are only read while the data that
+waits between the stages (contents read and not converted yet, outputs not
+written yet) is under a memory limit.
+"""
+
+from collections import deque
+from functools import partial
+import threading
+import time
+
+from paleoconv.batch import iter_batch
+
+
+# Default limit of the data waiting between the stages (MB)
+MAX_MEMORY=256
+# Files read in advance per reading thread
+AHEAD=4
+_END=object()
+
+
+class MemoryBudget:
+    """
+    Bytes of the data held between the stages. The threads add the bytes
+    they hold and free them when the data passes to the next stage
+    """
+    
+    def __init__(self, limit):
+        self.limit=limit
+        self.used=0
+        self.peak=0
+        self._lock=threading.Lock()
+    
+    def add(self, n_bytes):
+        with self._lock:
+            self.used+=n_bytes
+            self.peak=max(self.peak, self.used)
+    
+    def free(self, n_bytes):
+        with self._lock:
+            self.used-=n_bytes
+    
+    def full(self):
+        return self.used>=self.limit
+
+
+def _size(data):
+    return 0 if isinstance(data, Exception) else len(data)
+
+
+def _read(read, budget, item):
+    """
+    Reads one item in a reading thread. Output: item, data, seconds. If
+    the item cannot be read, 'data' is the error, so that the conversion
+    decides what to do with it
+    """
+    
+    t0=time.perf_counter()
+    try:
+        data=read(item)
+    except Exception as error:
+        data=error
+    seconds=time.perf_counter()-t0
+    budget.add(_size(data))
+    
+    return item, data, seconds
+
+
+def _process(process, entry):
+    """
+    Converts the data of one item, in this process or in a worker
+    Output: item, size of the data, result and outputs
+    """
+    
+    item, data, seconds=entry
+    result, outputs=process(item, data, seconds)
+    
+    return item, _size(data), result, outputs
+
+
+def _write(write, budget, item, result, outputs, n_bytes):
+    """
+    Writes the outputs of one item in a writing thread. Output: the error
+    if the outputs could not be written, None otherwise
+    """
+    
+    try:
+        write(item, result, outputs)
+    except Exception as error:
+        return error
+    finally:
+        budget.free(n_bytes)
+    return None
+
+
+def iter_overlapped(items, read, process, write, threads=4, jobs=1, max_memory=MAX_MEMORY):
+    """
+    Reads, converts and writes the items with the three stages overlapped
+    
+    Input:
+        items: iterable with the items (e.g. the names of the files)
+        read: function(item) -> data (bytes), run in the reading threads
+        process: function(item, data, seconds of the reading) -> (result, outputs),
+            defined at module level (it is sent to the worker processes with
+            jobs>1). 'data' is the error of read if the item could not be
+            read, and 'outputs' a dictionary with the texts to write
+        write: function(item, result, outputs), run in the writing threads
+        threads: number of reading threads, and of writing threads
+        jobs: number of processes of the conversion (see paleoconv.batch)
+        max_memory: limit (MB) of the data waiting between the stages. Each
+            reading thread can go over it by the file it is reading
+    Yields:
+        (result, error of the write), in the order of 'items', as soon as
+        the outputs of the item have been written. The error is None if
+        they were written
+    """
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    budget=MemoryBudget(max_memory*1e6)
+    items=iter(items)
+    reads=deque()
+    writes=deque()
+    readers=ThreadPoolExecutor(max_workers=threads, thread_name_prefix='paleoconv-read')
+    writers=ThreadPoolExecutor(max_workers=threads, thread_name_prefix='paleoconv-write')
+    
+    def contents():
+        # Contents in the order of the items. More files are read while the
+        # queue is not full, and at least one is always being read
+        while True:
+            while not reads or (len(reads)<threads*AHEAD and not budget.full()):
+                item=next(items, _END)
+                if item is _END:
+                    break
+                reads.append(readers.submit(_read, read, budget, item))
+            if not reads:
+                return
+            yield reads.popleft().result()
+    
+    try:
+        for item, n_data, result, outputs in iter_batch(partial(_process, process), contents(),
+                                                        jobs):
+            n_bytes=sum(len(text) for text in outputs.values())
+            budget.add(n_bytes)
+            budget.free(n_data)
+            writes.append((writers.submit(_write, write, budget, item, result, outputs, n_bytes),
+                           result))
+            # The results are given when their outputs have been written, and
+            # the conversion waits for the writes while the memory is full
+            while writes and (writes[0][0].done() or budget.full()):
+                future, result=writes.popleft()
+                yield result, future.result()
+        while writes:
+            future, result=writes.popleft()
+            yield result, future.result()
+    finally:
+        for future in reads:
+            future.cancel()
+        for future, result in writes:
+            future.cancel()
+        readers.shutdown()
+        writers.shutdown()
@@ -0,0 +1,763 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Converts 2G *.dat files to several formats in a single pass.
+Each file is parsed once and the result is given to every formatter.
+"""
+
+import argparse
+import csv
+from functools import partial
+from glob import escape, glob
+import io
+import os
+import posixpath
+import sys
+
+from paleoconv.dat2g import read_dat, decode_header, Steps
+from paleoconv.batch import iter_batch, add_jobs_argument
+from paleoconv.overlap import MAX_MEMORY
+from paleoconv.preflight import QUARANTINE_DIR, quarantine_exclude, run_preflight
+from paleoconv.specimen import DEMAG_TYPES, Selection, is_selected, select_specimens
+from paleoconv.asci import asci_header, asci_step
+from paleoconv.rs3 import rs3_header, rs3_step, rs3_text
+from paleoconv.profile import NO_TIMER, StageTimer, Profile, PROFILE_FILE
+from paleoconv.scan import scan_tree
+from paleoconv.archive import is_archive, archive_stem, iter_members, open_sink
+from paleoconv.utrecht import utrecht_header, utrecht_step, END_SPECIMEN, UtrechtWriter
+from paleoconv.manifest import (MANIFEST_FILE, load_manifest, save_manifest, file_state,
+                                content_hash, pending_formats, record, forget_missing,
+                                utrecht_up_to_date, record_utrecht)
+
+
+# Output formats: extension of the files
+FORMATS=('asc', 'rs3', 'th')
+UTRECHT_FILE='Utrecht_format.th'
+# Encoding of the output files (None: the one of the system)
+ENCODINGS={'asc': None, 'rs3': 'cp1252'}
+
+
+def filename(folder='.', verbose=True, recursive=False, include=(), exclude=()):
+    """
+    Gets the name of .dat files present in 'folder' (and in its subfolders
+    if 'recursive'), selected with the include/exclude globs (see paleoconv.scan)
+    Output:
+        List with the path of each *.dat file (only the name for the current folder),
+        sorted by folder and by name
+    """
+    
+    files_name=scan_tree(folder, '.dat', include, exclude, recursive)
+    if folder=='.':
+        files_name=[f[2:] for f in files_name]
+    if verbose:
+        print(len(files_name), '*.dat files found')
+    
+    return files_name
+
+
+def output_name(file, ext, out_dir=None):
+    """
+    Name of the output file of 'file' in the format 'ext', in 'out_dir'
+    (next to 'file' if None). The Utrecht file is written in the folder
+    """
+    
+    if ext=='th':
+        return os.path.join(out_dir or os.path.dirname(file), UTRECHT_FILE)
+    if out_dir is None:
+        return file[:-3]+ext
+    return os.path.join(out_dir, os.path.basename(file)[:-3]+ext)
+
+
+def output_folders(files, folder='.', output=None):
+    """
+    Groups the files by folder, and gives the output folder of each one
+    
+    Input:
+        files: paths of the *.dat files, with the files of each folder together
+        folder: root of the input folders
+        output: root of the output folders. The tree of folders under 'folder'
+            is copied under 'output'. If None, the outputs are written next
+            to the input files
+    Output:
+        List of (output folder, files of the folder)
+    """
+    
+    groups=[]
+    for file in files:
+        in_dir=os.path.dirname(file) or '.'
+        if not groups or groups[-1][0]!=in_dir:
+            groups.append((in_dir, []))
+        groups[-1][1].append(file)
+    if not groups:
+        groups=[(folder, [])]
+    
+    if output is None:
+        return groups
+    return [(os.path.normpath(os.path.join(output, os.path.relpath(in_dir, folder))), group)
+            for in_dir, group in groups]
+
+
+def format_file(buf, formats, timer=NO_TIMER, keep=None):
+    """
+    Decodes the content of one *.dat file and formats it.
+    The steps are decoded one at a time and each one is given to all the
+    formats before decoding the next one
+    
+    Input:
+        buf: content of the *.dat file
+        formats: formats to generate (see FORMATS)
+        timer: paleoconv.profile.StageTimer to time the stages (--profile).
+            The steps are then decoded before formatting them, so that
+            both stages are timed apart
+        keep: function of the label of a step, True for the steps to convert
+            (see paleoconv.specimen.Selection). The other steps are not decoded
+    Output:
+        block: block of the specimen for the Utrecht file, or None if 'th'
+            is not in formats
+        digest: hash of the content of the file
+        outputs: dictionary format -> text of the *.asc and *.rs3 files
+    """
+    
+    digest=content_hash(buf)
+    timer.lap('read', len(buf))
+    header=decode_header(buf)
+    timer.lap('header')
+    data=Steps(buf, keep)
+    if timer is not NO_TIMER:
+        data=list(data)
+    n_steps=len(data)
+    timer.count(n_steps)
+    timer.lap('steps')
+    
+    asc=rs3=block=None
+    if 'asc' in formats:
+        asc_text=io.StringIO()
+        asc=csv.writer(asc_text, delimiter='\t', lineterminator='\n')
+        asc.writerows(asci_header(header, n_steps))
+    if 'rs3' in formats:
+        # The type of demagnetization is the one of the last step of the
+        # file, also when only some of the steps are selected
+        steps=data if keep is None else Steps(buf)
+        rs3, treat=rs3_header(header, steps[-1] if len(steps)>0 else None)
+    if 'th' in formats:
+        block=[utrecht_header(header)]
+    
+    # The *.asc and *.th files only have steps if there is more than one
+    step=[]
+    for i, dato in enumerate(data, 1):
+        if asc is not None and n_steps>1:
+            asc.writerow(asci_step(i, dato))
+        if rs3 is not None:
+            rs3.append(rs3_step(dato, treat))
+        if block is not None and n_steps>1:
+            paso=utrecht_step(dato, step)
+            step=paso[0]
+            block.append(paso)
+    if block is not None and n_steps>1:
+        block.append(END_SPECIMEN)
+    
+    outputs={}
+    if asc is not None:
+        outputs['asc']=asc_text.getvalue()
+    if rs3 is not None:
+        outputs['rs3']=rs3_text(rs3)
+    timer.lap('format')
+    
+    return block, digest, outputs
+
+
+def convert_file(file, formats, timer=NO_TIMER, out_dir=None, keep=None):
+    """
+    Parses one *.dat file and writes the *.asc and/or *.rs3 files next to it
+    (or in 'out_dir'). Each output file is written with a single write
+    
+    Input:
+        file: name of the *.dat file
+        formats: formats to generate (see FORMATS)
+        timer: paleoconv.profile.StageTimer to time the stages (see format_file)
+        out_dir: folder of the output files (None: the folder of the *.dat file)
+        keep: steps to convert (see format_file)
+    Output:
+        block: block of the specimen for the Utrecht file, or None if 'th'
+            is not in formats
+        digest: hash of the content of the file
+    """
+    
+    block, digest, outputs=format_file(read_dat(file), formats, timer, keep)
+    
+    n_bytes=0
+    for ext, text in outputs.items():
+        with open(output_name(file, ext, out_dir), 'w', encoding=ENCODINGS[ext]) as file_out:
+            n_bytes+=file_out.write(text)
+    timer.lap('write', n_bytes)
+    
+    return block, digest
+
+
+def error_text(error):
+    """
+    Text of an error that stops the conversion of one file
+    """
+    
+    return f'{type(error).__name__}: {error}'
+
+
+def _convert_item(item):
+    """
+    convert_file for the items (file, formats, profile, out_dir, keep) of iter_batch.
+    Output: block, digest, the record of the stages if 'profile' is True and
+        the error that stopped the conversion of the file (None if converted)
+    """
+    
+    file, formats, profile, out_dir, keep=item
+    timer=StageTimer() if profile else NO_TIMER
+    try:
+        block, digest=convert_file(file, formats, timer, out_dir, keep)
+    except Exception as error:
+        return None, None, None, error_text(error)
+    
+    return block, digest, timer.record(file) if profile else None, None
+
+
+def _read_item(item):
+    """
+    Content of the *.dat file of an item of convert
+    """
+    
+    return read_dat(item[0])
+
+
+def _format_item(item, buf, read_seconds):
+    """
+    format_file for the items (file, formats, profile, out_dir, keep) of convert,
+    with the content already read (--io-threads). 'buf' is the error if the
+    file could not be read
+    Output: (block, digest, record of the stages, error), outputs
+    """
+    
+    file, formats, profile, out_dir, keep=item
+    timer=StageTimer() if profile else NO_TIMER
+    try:
+        if isinstance(buf, Exception):
+            raise buf
+        block, digest, outputs=format_file(buf, formats, timer, keep)
+    except Exception as error:
+        return (None, None, None, error_text(error)), {}
+    if not profile:
+        return (block, digest, None, None), outputs
+    record=timer.record(file)
+    record['stages']['read']+=read_seconds
+    record['seconds']+=read_seconds
+    
+    return (block, digest, record, None), outputs
+
+
+def _write_item(item, result, outputs):
+    """
+    Writes the outputs of an item of convert (--io-threads)
+    """
+    
+    file, formats, profile, out_dir, keep=item
+    timer=StageTimer()
+    n_bytes=0
+    for ext, text in outputs.items():
+        with open(output_name(file, ext, out_dir), 'w', encoding=ENCODINGS[ext]) as file_out:
+            n_bytes+=file_out.write(text)
+    record=result[2]
+    if record is not None:
+        timer.lap('write', n_bytes)
+        record['stages']['write']=timer.times['write']
+        record['bytes']['write']=n_bytes
+        record['seconds']+=timer.times['write']
+
+
+def _plan_folder(files, out_dir, formats, incremental, th_split, unstable=()):
+    """
+    Files of one folder that have to be converted, and to which formats
+    Output:
+        items: list of (file, formats of the file)
+        with_th: True if the Utrecht file of the folder has to be written
+        manifest: manifest of the folder (None if not incremental)
+        states: file_state of each file, taken before converting them
+        files: files of the Utrecht file of the folder
+    """
+    
+    with_th='th' in formats
+    if not incremental:
+        files=[file for file in files if file not in unstable]
+        return [(file, formats) for file in files], with_th, None, None, files
+    
+    manifest=load_manifest(os.path.join(out_dir, MANIFEST_FILE))
+    # The files that are still being written are not converted, but the
+    # ones converted before are kept in the manifest and in the Utrecht file
+    files=[file for file in files
+           if file not in unstable or os.path.abspath(file) in manifest['files']]
+    states={}
+    pending={}
+    changed=forget_missing(manifest, files)
+    for file in files:
+        states[file]=file_state(file)
+        if file in unstable:
+            pending[file]=[]
+            continue
+        pending[file], file_changed=pending_formats(manifest, file, formats, states[file])
+        changed=changed or file_changed
+    
+    # The Utrecht file needs the block of every specimen, so all the files
+    # are parsed again when it has to be rebuilt
+    with_th=with_th and (changed or not utrecht_up_to_date(manifest, files, th_split))
+    items=[]
+    for file in files:
+        file_formats=[ext for ext in pending[file] if ext!='th']
+        if with_th:
+            file_formats.append('th')
+        if file_formats:
+            items.append((file, tuple(file_formats)))
+    
+    return items, with_th, manifest, states, files
+
+
+def convert(files, formats=FORMATS, jobs=1, incremental=False, th_split=None, folder='.',
+            profile=None, output=None, io_threads=0, max_memory=MAX_MEMORY, keep=None,
+            unstable=()):
+    """
+    Converts all the files to the requested formats
+    
+    Input:
+        files: list with the names of the *.dat files. The files of each folder
+            have to be together (as given by filename)
+        formats: formats to generate (see FORMATS)
+        jobs: number of processes
+        incremental: if True, only the new or modified files are converted
+            (see paleoconv.manifest). Utrecht_format.th is only written again
+            when any of its specimens has changed
+        th_split: if given, the Utrecht file is split in files of th_split specimens
+        folder: root folder of the files
+        profile: paleoconv.profile.Profile where the time of the stages of
+            each file is recorded (--profile)
+        output: root of the output folders (see output_folders). If None,
+            the outputs are written next to the *.dat files
+        io_threads: if given, the files are read and the outputs are written
+            by this number of threads, overlapped with the conversion (see
+            paleoconv.overlap), with at most max_memory MB waiting between them
+        keep: steps to convert (see format_file). None: all the steps
+        unstable: files of 'files' that are still being written (watch mode).
+            They are not converted, and with 'incremental' the ones that
+            were converted before stay in the manifest and in the Utrecht
+            file (parsed as they are now)
+    Output:
+        list of (file, error) of the files that could not be converted. They
+        are left out of the Utrecht files and of the manifests, and the
+        conversion goes on with the other files
+    
+    Each folder has its own Utrecht file and manifest, in its output folder.
+    The Utrecht files are written while the files are converted, one specimen
+    at a time, and all the folders share the same pool of processes.
+    """
+    
+    formats=tuple(formats)
+    unstable=set(unstable)
+    plans=[]
+    items=[]
+    for out_dir, group in output_folders(files, folder, output):
+        group_items, with_th, manifest, states, group=_plan_folder(group, out_dir, formats,
+                                                                  incremental, th_split,
+                                                                  unstable)
+        if output is not None and (group_items or with_th):
+            os.makedirs(out_dir, exist_ok=True)
+        plans.append((out_dir, group, with_th, manifest, states, len(group_items)))
+        file_dir=out_dir if output is not None else None
+        items+=[(file, file_formats, out_dir, file_dir) for file, file_formats in group_items]
+    
+    # The Utrecht files are written in this process, one folder after the other
+    timer=NO_TIMER if profile is None else profile.run
+    work=[(file, file_formats, profile is not None, file_dir, keep)
+          for file, file_formats, out_dir, file_dir in items]
+    if io_threads:
+        from paleoconv.overlap import iter_overlapped
+        # A file whose outputs could not be written fails as the others
+        results=(result if error is None else (None, None, None, error_text(error))
+                 for result, error in iter_overlapped(work, _read_item, _format_item, _write_item,
+                                                      io_threads, jobs, max_memory))
+    else:
+        results=iter_batch(_convert_item, work, jobs)
+    th=None
+    failed=[]
+    try:
+        start=0
+        for out_dir, group, with_th, manifest, states, n_items in plans:
+            if with_th:
+                th=UtrechtWriter(os.path.join(out_dir, UTRECHT_FILE), th_split)
+            for file, file_formats, out_dir, file_dir in items[start:start+n_items]:
+                block, digest, stages, error=next(results)
+                if error is not None:
+                    print(f'Error!!! {file} could not be converted: {error}')
+                    failed.append((file, error))
+                    continue
+                if th is not None:
+                    timer.start()
+                    th.add(block)
+                    timer.lap('write')
+                if manifest is not None and file not in unstable:
+                    outputs={ext: output_name(file, ext, file_dir)
+                             for ext in file_formats if ext!='th'}
+                    record(manifest, file, states[file], digest, outputs)
+                if profile is not None:
+                    profile.add(stages)
+            start+=n_items
+        
+            if th is not None:
+                timer.start()
+                th.close()
+                timer.lap('write')
+            if th is not None:
+                _remove_stale_utrecht(th, manifest)
+            if manifest is not None:
+                if th is not None:
+                    record_utrecht(manifest, group, th.outputs, th_split)
+                save_manifest(manifest, os.path.join(out_dir, MANIFEST_FILE))
+            th=None
+    finally:
+        if th is not None:
+            th.close()
+    
+    wrong={file for file, error in failed}
+    for ext in formats:
+        if ext!='th':
+            n=sum(1 for item in items if ext in item[1] and item[0] not in wrong)
+            if not incremental:
+                print(n, f'files converted to *.{ext}')
+            else:
+                print(n, f'files converted to *.{ext}',
+                      f'({len(files)-n-len(wrong)} up to date)')
+    if 'th' in formats:
+        for out_dir, group, with_th, manifest, states, n_items in plans:
+            if not with_th:
+                print(os.path.join(out_dir, UTRECHT_FILE), 'is up to date')
+    print_failed(failed)
+    
+    return failed
+
+
+def _remove_stale_utrecht(th, manifest=None):
+    """
+    Utrecht files of the folder of 'th' (UtrechtWriter already closed) that
+    were not written now: the single file after a split one, or the opposite,
+    or the parts left over from a larger split. The ones written by the last
+    run (recorded in the manifest) are removed, the others are reported
+    """
+    
+    written={os.path.abspath(name) for name in th.outputs}
+    recorded=set(manifest['utrecht'].get('outputs', ())) if manifest is not None else set()
+    others=[th.name_th]+sorted(glob(escape(th.name_th[:-3])+'_[0-9][0-9][0-9].th'))
+    for name in others:
+        if os.path.abspath(name) in written or not os.path.isfile(name):
+            continue
+        if os.path.abspath(name) in recorded:
+            try:
+                os.remove(name)
+                print(f'{name} removed (written by the last run)')
+            except OSError as error:
+                print(f'Warning!!! {name} could not be removed: {error_text(error)}')
+            continue
+        print(f'Warning!!! {name} is not from this run: remove it if it is an old Utrecht file')
+
+
+def print_failed(failed):
+    """
+    Summary of the files that could not be converted
+    """
+    
+    if failed:
+        print(f'\n{len(failed)} files could not be converted:')
+        for file, error in failed:
+            print(f'  {file}: {error}')
+
+
+def _convert_source(item):
+    """
+    format_file for the items (name, content, formats, profile, keep) of convert_stream.
+    'content' is the content of the file, or the path of the file to read
+    Output: name, block, outputs, the record of the stages if 'profile' is True
+        and the error that stopped the conversion of the file (None if converted)
+    """
+    
+    name, content, formats, profile, keep=item
+    timer=StageTimer() if profile else NO_TIMER
+    try:
+        if isinstance(content, str):
+            content=read_dat(content)
+        block, digest, outputs=format_file(content, formats, timer, keep)
+    except Exception as error:
+        return name, None, {}, None, error_text(error)
+    
+    return name, block, outputs, timer.record(name) if profile else None, None
+
+
+def convert_stream(sources, sink, formats=FORMATS, jobs=1, th_split=None, profile=None,
+                   keep=None):
+    """
+    Converts *.dat files that are read one after the other (e.g. the members
+    of an archive, see paleoconv.archive) and writes the outputs through 'sink'
+    
+    Input:
+        sources: iterable of (name, content). The name is the path of the output
+            files (without extension, with '/' as separator) relative to the
+            sink, and the content the bytes of the file, or its path
+        sink: paleoconv.archive.FolderSink or ArchiveSink
+        formats, jobs, th_split, profile, keep: see convert
+    Output:
+        Number of files converted, and list of (name, error) of the files
+        that could not be converted
+    
+    The *.asc and *.rs3 files are written as soon as each file is converted.
+    The Utrecht file of each folder is written at the end, with the specimens
+    sorted by name, as in the folders converted by convert.
+    """
+    
+    formats=tuple(formats)
+    timer=NO_TIMER if profile is None else profile.run
+    n_files=0
+    blocks={}
+    failed=[]
+    items=((name, content, formats, profile is not None, keep) for name, content in sources)
+    for name, block, outputs, stages, error in iter_batch(_convert_source, items, jobs):
+        if error is not None:
+            print(f'Error!!! {name} could not be converted: {error}')
+            failed.append((name, error))
+            continue
+        timer.start()
+        n_bytes=0
+        for ext, text in outputs.items():
+            n_bytes+=sink.write(name[:-3]+ext, text, ENCODINGS[ext])
+        timer.lap('write', n_bytes)
+        if block is not None:
+            blocks.setdefault(posixpath.dirname(name), []).append((name, block))
+        if profile is not None:
+            profile.add(stages)
+        n_files+=1
+    
+    for ext in formats:
+        if ext!='th':
+            print(n_files, f'files converted to *.{ext}')
+    
+    if 'th' in formats:
+        for folder in sorted(blocks) or ['']:
+            timer.start()
+            name_th=posixpath.join(folder, UTRECHT_FILE)
+            with UtrechtWriter(sink.local_name(name_th), th_split, sink.label(name_th)) as th:
+                for name, block in sorted(blocks.get(folder, []), key=lambda x: x[0]):
+                    th.add(block)
+            for path in th.outputs:
+                sink.commit(path, posixpath.join(folder, os.path.basename(path)))
+            timer.lap('write')
+    print_failed(failed)
+    
+    return n_files, failed
+
+
+def select_files(files, folder, where, jobs=1):
+    """
+    Updates the catalog of 'folder' with the files, and keeps only the
+    files that meet the SQL condition 'where' (see paleoconv.catalog). The
+    files that cannot be read are kept, so that the conversion reports them
+    """
+    
+    from paleoconv.catalog import CATALOG_FILE, update_catalog, catalog_files
+    
+    db=os.path.join(folder, CATALOG_FILE)
+    failed=update_catalog(db, files, jobs)[3]
+    selection=set(catalog_files(db, where))
+    selection.update(os.path.normpath(file) for file, error in failed)
+    files=[file for file in files if os.path.normpath(file) in selection]
+    print(len(files), 'files selected by the query')
+    
+    return files
+
+
+def main(argv=None, formats=FORMATS, description=None):
+    """
+    Command line entry point. 'formats' are the formats generated when
+    the --formats option is not given, and 'argv' the list of arguments
+    (sys.argv[1:] if None)
+    """
+    
+    parser=argparse.ArgumentParser(description=description or
+                                   'Converts 2G *.dat files to *.asc, *.rs3 and Utrecht_format.th')
+    parser.add_argument('folder', nargs='?', default='.',
+                        help='folder (or zip/tar archive) with the *.dat files '
+                             '(default: the current folder)')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='also convert the *.dat files of all the subfolders')
+    parser.add_argument('-o', '--output', default=None, metavar='FOLDER',
+                        help='write the outputs in this folder, or in this zip/tar archive, '
+                             'with the same subfolders as the input folder (default: next '
+                             'to the *.dat files, or a folder with the name of the input archive)')
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB',
+                        help='convert only the files that match the glob (path relative to '
+                             'the folder, or name, e.g. "2019/*" or "BU*.dat"). Can be repeated')
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help='skip the files and subfolders that match the glob. Can be repeated')
+    parser.add_argument('--query', default=None, metavar='WHERE',
+                        help='convert only the specimens that meet this SQL condition in the '
+                             'catalog of the folder (e.g. "dip>60 AND time>=\'2019-06-01\'"). '
+                             'The catalog (see paleoconv.catalog) is updated first')
+    parser.add_argument('--specimen', action='append', default=[], metavar='PREFIX',
+                        help='convert only the specimens whose name (in the header) starts '
+                             'with PREFIX. Can be repeated')
+    parser.add_argument('--demag', default=None, choices=DEMAG_TYPES,
+                        help='convert only the specimens with this type of demagnetization '
+                             '(from the last step: 100C is thermal, 20mT is AF)')
+    parser.add_argument('--steps', action='append', default=[], metavar='LABELS',
+                        help='convert only these steps: comma separated labels or globs '
+                             '(e.g. "NRM,100C,200C" or "NRM,*mT"). Can be repeated. The other '
+                             'steps are not decoded')
+    parser.add_argument('-f', '--formats', default=','.join(formats),
+                        help='comma separated list of formats to generate '
+                             f'({", ".join(FORMATS)}; default {",".join(formats)})')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='convert only the files that are new or have changed since '
+                             f'the last run (the record is kept in {MANIFEST_FILE})')
+    parser.add_argument('-w', '--watch', action='store_true',
+                        help='keep running and convert the *.dat files as soon as they are '
+                             'written (implies --incremental)')
+    parser.add_argument('--interval', type=float, default=2.,
+                        help='watch mode: seconds between two checks of the folder (default 2)')
+    parser.add_argument('--debounce', type=float, default=5.,
+                        help='watch mode: seconds without changes before a file is '
+                             'converted (default 5)')
+    parser.add_argument('-c', '--check', nargs='?', type=float, const=2., default=None,
+                        metavar='TOLERANCE',
+                        help='check that the stored directions agree with the ones recomputed '
+                             'from X/Y/Z and the orientation of the header, and report the '
+                             'specimens that differ more than TOLERANCE degrees (default 2)')
+    parser.add_argument('--profile', nargs='?', const=PROFILE_FILE, default=None, metavar='FILE',
+                        help='time each stage of the conversion (folder scan, reading, '
+                             'header and step decoding, formatting, writing), print the '
+                             f'slowest files and save the report in FILE (default {PROFILE_FILE}, '
+                             'in the folder of the files)')
+    parser.add_argument('--export', default=None, metavar='FILE.npz',
+                        help='also save the parsed collection (headers and steps, typed) in '
+                             'one binary file, that paleoconv.store.load_collection opens with '
+                             'mmap')
+    parser.add_argument('--th-split', type=int, default=None, metavar='N',
+                        help='write the Utrecht file in several files of N specimens each')
+    parser.add_argument('--preflight', action='store_true',
+                        help='check all the files before converting them (header and steps, '
+                             'without converting them) and leave out the ones with problems')
+    parser.add_argument('--quarantine', nargs='?', const=None, default=False, metavar='DIR',
+                        help='--preflight, and move the files with problems to DIR (default '
+                             f'{QUARANTINE_DIR} in the folder, which is never converted)')
+    parser.add_argument('--io-threads', type=int, default=0, metavar='N',
+                        help='read and write the files with N threads, while the files read '
+                             'before are converted (for folders on network shares)')
+    parser.add_argument('--max-memory', type=float, default=MAX_MEMORY, metavar='MB',
+                        help='with --io-threads, limit of the data read or converted that '
+                             f'waits to be converted or written (default {MAX_MEMORY} MB)')
+    add_jobs_argument(parser)
+    args=parser.parse_args(argv)
+    
+    formats=[ext.strip() for ext in args.formats.split(',') if ext.strip()]
+    for ext in formats:
+        if ext not in FORMATS:
+            parser.error(f'unknown format {ext!r}')
+    
+    if args.watch and args.profile:
+        parser.error('--profile cannot be used with --watch')
+    in_archive=is_archive(args.folder) and os.path.isfile(args.folder)
+    out_archive=args.output is not None and is_archive(args.output)
+    if (in_archive or out_archive) and (args.incremental or args.watch):
+        parser.error('--incremental and --watch cannot be used with zip/tar archives')
+    if in_archive and args.check is not None:
+        parser.error('--check cannot be used with zip/tar archives')
+    if args.export and (in_archive or args.watch):
+        parser.error('--export cannot be used with --watch or with zip/tar archives')
+    if args.query and (in_archive or args.watch):
+        parser.error('--query cannot be used with --watch or with zip/tar archives')
+    selection=Selection(args.specimen, [label.strip() for labels in args.steps
+                                        for label in labels.split(',') if label.strip()],
+                        args.demag)
+    if selection and args.watch:
+        parser.error('--specimen, --demag and --steps cannot be used with --watch')
+    if selection.steps and args.incremental:
+        parser.error('--steps cannot be used with --incremental')
+    preflight=args.preflight or args.quarantine is not False
+    if preflight and (in_archive or args.watch):
+        parser.error('--preflight cannot be used with --watch or with zip/tar archives')
+    # The files moved to quarantine are not converted again
+    exclude=args.exclude+quarantine_exclude(args.folder, args.quarantine)
+    
+    if args.watch:
+        from paleoconv.watch import watch
+        watch(partial(convert, formats=formats, jobs=args.jobs, incremental=True,
+                      th_split=args.th_split, folder=args.folder, output=args.output,
+                      io_threads=args.io_threads, max_memory=args.max_memory),
+              partial(filename, args.folder, verbose=False, recursive=args.recursive,
+                      include=args.include, exclude=exclude),
+              args.interval, args.debounce)
+        return
+    
+    profile=Profile() if args.profile else None
+    if in_archive:
+        # The members are read while the files are converted
+        output=args.output or archive_stem(args.folder)
+        sources=iter_members(args.folder, '.dat', args.include, exclude)
+        if selection.specimens:
+            sources=((name, content) for name, content in sources
+                     if is_selected(content, selection))
+        with open_sink(output) as sink:
+            n, failed=convert_stream(sources, sink, formats, args.jobs, args.th_split, profile,
+                                     selection.keep)
+        print(n, f'*.dat files read from {args.folder}, outputs written in {output}')
+        files=[]
+        n_wrong=len(failed)
+    else:
+        files=filename(args.folder, True, args.recursive, args.include, exclude)
+        if profile is not None:
+            profile.run.lap('scan')
+        if args.query:
+            files=select_files(files, args.folder, args.query, args.jobs)
+        if selection.specimens:
+            files=select_specimens(files, selection)
+            print(len(files), 'specimens selected')
+        n_files=len(files)
+        if preflight:
+            files=run_preflight(files, formats, args.folder, args.quarantine)
+        if out_archive:
+            names={os.path.relpath(file, args.folder).replace(os.sep, '/'): file for file in files}
+            with open_sink(args.output) as sink:
+                n, failed=convert_stream(names.items(), sink, formats, args.jobs, args.th_split,
+                                         profile, selection.keep)
+            failed=[(names[name], error) for name, error in failed]
+        else:
+            failed=convert(files, formats, args.jobs, args.incremental, args.th_split,
+                           args.folder, profile, args.output, args.io_threads, args.max_memory,
+                           selection.keep)
+        # The check and the export only use the files that were converted
+        wrong={file for file, error in failed}
+        files=[file for file in files if file not in wrong]
+        n_wrong=n_files-len(files)
+    
+    if profile is not None:
+        profile.finish()
+        profile.report()
+        if in_archive or out_archive:
+            name_profile=os.path.join(os.path.dirname(args.output or args.folder), args.profile)
+        else:
+            name_profile=os.path.join(args.output or args.folder, args.profile)
+        profile.save(name_profile)
+        print(f'\nProfile saved in {name_profile}')
+    
+    if args.check is not None:
+        # NumPy is only needed for the check
+        from paleoconv.check import check_files, print_report
+        print_report(check_files(files, args.check), len(files), args.check)
+    
+    if args.export:
+        from paleoconv.store import Collection
+        Collection.from_files(files, selection.keep).save(args.export)
+        print(f'Collection of {len(files)} specimens saved in {args.export}')
+    
+    if n_wrong:
+        sys.exit(1)
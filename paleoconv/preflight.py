@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Pre-flight check of the *.dat files (--preflight), before the conversion.
+
+Each file is checked without converting it: the length of the header, the
+header fields that the formats need as numbers, and a scan of the steps
+that only decodes the fields the formats need as numbers or dates. The
+files are checked in parallel by a pool of threads. The files with problems
+are reported, left out of the conversion and, with --quarantine, moved to
+a quarantine folder, so that they do not stop the conversion of the others.
+
+Usage:
+    python -m paleoconv.preflight [folder] [-r] [-f asc,rs3,th] [--quarantine [DIR]]
+"""
+
+import argparse
+from glob import escape
+import os
+import sys
+
+from paleoconv.dat2g import read_dat, decode_header, Steps, OVER_POS
+from paleoconv.timestamps import utrecht_date
+
+
+# Length of the header: the last field is the overturned flag
+HEADER_SIZE=OVER_POS+1
+QUARANTINE_DIR='paleoconv_quarantine'
+QUARANTINE_LOG='quarantine.log'
+
+# Fields of the steps read as numbers by the formats: M for the *.rs3
+# files (which also write the directions, fields 1 to 6), X, Y and Z for
+# the Utrecht file, which also reads the date (field 25)
+NUMBER_FIELDS={'rs3': (8,), 'th': (9, 13, 17)}
+DATE_FIELD=25
+
+
+def check_dat(file, formats=('asc', 'rs3', 'th')):
+    """
+    Checks that a *.dat file can be converted to the formats
+    
+    Output:
+        None if the file is correct, or the text of the problem
+    """
+    
+    try:
+        buf=read_dat(file)
+    except OSError as error:
+        return f'cannot be read ({error.strerror})'
+    if len(buf)<HEADER_SIZE:
+        return f'truncated header ({len(buf)} of {HEADER_SIZE} bytes)'
+    
+    header=decode_header(buf)
+    try:
+        if 'th' in formats:
+            int(header[6])
+        if header[8]!=0 and ('th' in formats or 'rs3' in formats):
+            int(header[7])
+    except ValueError:
+        return f'wrong bedding in the header (DA {header[6]!r}, DP {header[7]!r})'
+    
+    steps=Steps(buf)
+    # The steps are only written in the Utrecht file if there are several
+    with_th='th' in formats and len(steps)>1
+    numbers=NUMBER_FIELDS['rs3'] if 'rs3' in formats else ()
+    if with_th:
+        numbers+=NUMBER_FIELDS['th']
+    fields=numbers+(DATE_FIELD,) if with_th else numbers
+    if not fields:
+        return None
+    
+    data=steps.iter_fields(fields)
+    for k in range(1, len(steps)+1):
+        try:
+            dato=next(data)
+        except IndexError:
+            return f'step {k} of {len(steps)} is incomplete'
+        for i in numbers:
+            try:
+                float(dato[i])
+            except ValueError:
+                return f'step {k}: field {i} is not a number ({dato[i]!r})'
+        if with_th:
+            date=dato[DATE_FIELD].split(' ')
+            try:
+                utrecht_date(date[0]+' '+date[1]+' '+date[2])
+            except (IndexError, ValueError):
+                return f'step {k}: wrong date ({dato[DATE_FIELD]!r})'
+    
+    return None
+
+
+def preflight(files, formats=('asc', 'rs3', 'th'), threads=8):
+    """
+    Checks all the files, reading several of them at the same time
+    Output:
+        list of (file, problem) of the files with problems, in the order of 'files'
+    """
+    
+    if threads>1 and len(files)>1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            problems=list(pool.map(check_dat, files, [formats]*len(files)))
+    else:
+        problems=[check_dat(file, formats) for file in files]
+    
+    return [(file, problem) for file, problem in zip(files, problems) if problem is not None]
+
+
+def quarantine(problems, folder='.', quarantine_dir=None):
+    """
+    Moves the files with problems to the quarantine folder, keeping their
+    subfolders under 'folder', and adds their problems to its log
+    
+    Input:
+        problems: output of preflight
+        quarantine_dir: quarantine folder (default: QUARANTINE_DIR in 'folder')
+    Output:
+        quarantine folder
+    """
+    
+    import shutil
+    
+    quarantine_dir=quarantine_dir or os.path.join(folder, QUARANTINE_DIR)
+    os.makedirs(quarantine_dir, exist_ok=True)
+    with open(os.path.join(quarantine_dir, QUARANTINE_LOG), 'a', encoding='utf-8') as log:
+        for file, problem in problems:
+            rel=os.path.relpath(file, folder)
+            if rel.startswith('..'):
+                rel=os.path.basename(file)
+            target=os.path.join(quarantine_dir, rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(file, target)
+            log.write(f'{rel}\t{problem}\n')
+    
+    return quarantine_dir
+
+
+def quarantine_exclude(folder='.', quarantine_dir=None):
+    """
+    Globs to exclude (see paleoconv.scan) the quarantine folders from the
+    files of 'folder': the default one and 'quarantine_dir', if it is inside
+    'folder' (it can be False or None, as in run_preflight)
+    """
+    
+    exclude=[QUARANTINE_DIR]
+    if quarantine_dir:
+        try:
+            rel=os.path.relpath(quarantine_dir, folder)
+        except ValueError:
+            # Another drive (Windows): it is not inside the folder
+            return exclude
+        if rel not in (os.curdir, os.pardir) and not rel.startswith(os.pardir+os.sep):
+            exclude.append(escape(rel.replace(os.sep, '/')))
+    
+    return exclude
+
+
+def run_preflight(files, formats, folder='.', quarantine_dir=False):
+    """
+    Checks the files, prints the problems and, if quarantine_dir is not
+    False, moves the files with problems to quarantine (None: the default
+    quarantine folder)
+    Output:
+        list with the files without problems
+    """
+    
+    problems=preflight(files, formats)
+    if not problems:
+        print(f'Pre-flight check: the {len(files)} *.dat files are correct')
+        return files
+    
+    print(f'Pre-flight check: {len(problems)} of {len(files)} *.dat files have problems')
+    for file, problem in problems:
+        print(f'  {file}: {problem}')
+    if quarantine_dir is not False:
+        quarantine_dir=quarantine(problems, folder, quarantine_dir)
+        print(f'They have been moved to {quarantine_dir}')
+    else:
+        print('They are not converted')
+    wrong={file for file, problem in problems}
+    
+    return [file for file in files if file not in wrong]
+
+
+def main(argv=None):
+    """
+    Command line entry point: checks the files without converting them
+    """
+    
+    from paleoconv.pipeline import filename, FORMATS
+    
+    parser=argparse.ArgumentParser(description='Checks that the 2G *.dat files can be converted')
+    parser.add_argument('folder', nargs='?', default='.',
+                        help='folder with the *.dat files (default: the current folder)')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='also check the *.dat files of all the subfolders')
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB')
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB')
+    parser.add_argument('-f', '--formats', default=','.join(FORMATS),
+                        help=f'formats that the files have to be converted to (default {",".join(FORMATS)})')
+    parser.add_argument('--quarantine', nargs='?', const=None, default=False, metavar='DIR',
+                        help=f'move the files with problems to DIR (default {QUARANTINE_DIR} '
+                             'in the folder)')
+    args=parser.parse_args(argv)
+    
+    formats=[ext.strip() for ext in args.formats.split(',') if ext.strip()]
+    files=filename(args.folder, True, args.recursive, args.include,
+                   args.exclude+quarantine_exclude(args.folder, args.quarantine))
+    if len(run_preflight(files, formats, args.folder, args.quarantine))<len(files):
+        sys.exit(1)
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Profiling of the conversion (--profile).
+
+The time and the bytes of each stage (directory scan, reading of the file,
+header decode, step decode, formatting and writing of the outputs) are
+recorded for every file, in the process that converts it, and added up in
+the main process. The report gives the share of each stage, the slowest
+files, and is also saved in a JSON file.
+"""
+
+import json
+import time
+
+
+# Stages of the conversion of a file, in order. 'scan' (listing of the
+# folder) is only timed once per run
+STAGES=('scan', 'read', 'header', 'steps', 'format', 'write')
+PROFILE_FILE='paleoconv_profile.json'
+
+
+class StageTimer:
+    """
+    Time and bytes of the stages of one file. lap(stage) adds the time
+    since the previous lap (or since the timer was created) to 'stage'
+    """
+    
+    __slots__=('times', 'bytes', 'n_steps', 't0')
+    
+    def __init__(self):
+        self.times={}
+        self.bytes={}
+        self.n_steps=0
+        self.t0=time.perf_counter()
+    
+    def start(self):
+        self.t0=time.perf_counter()
+    
+    def lap(self, stage, n_bytes=0):
+        t=time.perf_counter()
+        self.times[stage]=self.times.get(stage, 0.)+t-self.t0
+        if n_bytes:
+            self.bytes[stage]=self.bytes.get(stage, 0)+n_bytes
+        self.t0=t
+    
+    def count(self, n_steps):
+        self.n_steps+=n_steps
+    
+    def record(self, file):
+        """
+        Dictionary with the results of the file
+        """
+        
+        return {'file': file, 'steps': self.n_steps, 'seconds': sum(self.times.values()),
+                'stages': self.times, 'bytes': self.bytes}
+
+
+class NoTimer:
+    """
+    Timer that does nothing, used when the run is not profiled
+    """
+    
+    __slots__=()
+    
+    def start(self):
+        pass
+    
+    def lap(self, stage, n_bytes=0):
+        pass
+    
+    def count(self, n_steps):
+        pass
+
+
+NO_TIMER=NoTimer()
+
+
+class Profile:
+    """
+    Results of a profiled run: the records of the files (StageTimer.record)
+    and the time of the stages of the main process (scan of the folder and
+    writing of the Utrecht file)
+    """
+    
+    def __init__(self):
+        self.files=[]
+        self.run=StageTimer()
+        self.t_start=self.run.t0
+        self.wall=None
+    
+    def add(self, record):
+        self.files.append(record)
+    
+    def finish(self):
+        self.wall=time.perf_counter()-self.t_start
+    
+    def totals(self):
+        """
+        Total time and bytes of each stage. Output: {stage: (seconds, bytes)}
+        """
+        
+        totals={}
+        for stage, seconds in self.run.times.items():
+            totals[stage]=[seconds, self.run.bytes.get(stage, 0)]
+        for record in self.files:
+            for stage, seconds in record['stages'].items():
+                total=totals.setdefault(stage, [0., 0])
+                total[0]+=seconds
+                total[1]+=record['bytes'].get(stage, 0)
+        
+        return {stage: tuple(totals[stage]) for stage in STAGES if stage in totals}
+    
+    def slowest(self, n=10):
+        return sorted(self.files, key=lambda record: record['seconds'], reverse=True)[:n]
+    
+    def report(self, n_slowest=10):
+        """
+        Prints the time of each stage and the slowest files
+        """
+        
+        totals=self.totals()
+        busy=sum(seconds for seconds, n_bytes in totals.values()) or 1.
+        n_steps=sum(record['steps'] for record in self.files)
+        
+        print(f'\nProfile: {len(self.files)} files, {n_steps} steps, {self.wall:.3f} s')
+        print(f'{"stage":10}{"s":>10}{"%":>7}{"MB":>10}{"MB/s":>10}')
+        for stage, (seconds, n_bytes) in totals.items():
+            speed=f'{n_bytes/1e6/seconds:10.1f}' if n_bytes and seconds>0 else ''
+            print(f'{stage:10}{seconds:10.3f}{100*seconds/busy:7.1f}'
+                  f'{n_bytes/1e6:10.2f}{speed}')
+        print('(with --jobs the times of the files are added up over all the processes)')
+        
+        if self.files:
+            print('\nSlowest files:')
+            for record in self.slowest(n_slowest):
+                stage=max(record['stages'], key=record['stages'].get)
+                print(f'  {record["file"]}: {1000*record["seconds"]:.2f} ms, '
+                      f'{record["steps"]} steps (mostly {stage})')
+    
+    def save(self, file_name, n_slowest=10):
+        """
+        Writes the report, with the record of every file, in a JSON file
+        """
+        
+        out={'files': len(self.files),
+             'steps': sum(record['steps'] for record in self.files),
+             'wall_seconds': self.wall,
+             'stages': {stage: {'seconds': seconds, 'bytes': n_bytes}
+                        for stage, (seconds, n_bytes) in self.totals().items()},
+             'slowest': self.slowest(n_slowest),
+             'per_file': self.files}
+        with open(file_name, 'w') as f:
+            json.dump(out, f, indent=1)
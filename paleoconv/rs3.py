@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Remasoft (*.rs3) output.
+
+The rows are fixed width. They are built with precompiled templates and
+each file is written with a single write, with the same bytes that
+csv.writer (one field per row, cp1252, '\r\n') used to produce.
+"""
+
+
+HEADER_1=('Name'.ljust(10)+ 'Site'.ljust(10)+ 'Latitude'.ljust(10)+ 'Longitude'.ljust(11)+
+          'Height'.ljust(10)+ 'Rock'.ljust(15)+ 'Age'.ljust(5)+ 'Fm'.ljust(3)+
+          'SDec'.ljust(6)+ 'SInc'.ljust(6)+ 'BDec'.ljust(6)+ 'BInc'.ljust(6)+
+          'FDec'.ljust(6)+'FInc'.ljust(6)+ 'P1'.ljust(3)+ 'P2'.ljust(3)+ 'P3'.ljust(3)+
+          'P4'.ljust(3)+ 'Note'.ljust(4))
+
+# Name, SDec, SInc, BDec, BInc and the fixed columns FDec/FInc/P1...Note
+SPECIMEN_TEMPLATE=('{:<74}{:<6}{:<6}{:<6}{:<18}'+
+                   '12'.ljust(3)+ '90'.ljust(3)+ '12'.ljust(3)+ '0'.ljust(7))
+
+STEP_HEADER_TEMPLATE=('ID'.ljust(3)+ '{:<17}'+'M[A/m]'.ljust(9)+'Dsp'.ljust(6)+'Isp'.ljust(6)+
+                      'Dge'.ljust(6)+'Ige'.ljust(6)+'Dtc'.ljust(6)+'Itc'.ljust(6)+'Dfc'.ljust(6)+'Ifc'.ljust(6)+
+                      'Prec'.ljust(8)+'K[e-06 SI]'.ljust(11)+'Limit1'.ljust(10)+'Limit2'.ljust(10)+'Note'.ljust(10))
+
+# ID, step, M, Dsp, Isp, Dge, Ige, Dtc, Itc and the fixed Prec (1.0) and empty columns
+STEP_TEMPLATE=('{:<3}{:<3}{:>21}{:>6}{:>6}{:>6}{:>6}{:>6}{:>6}'+
+               '1.0'.rjust(18)+ ' '.rjust(45))
+
+LINE_END='\r\n'
+
+
+def rs3_treat(last_step):
+    """
+    Type of demagnetization, from the fields of the last step: 'T' (thermal)
+    or 'A' (AF), None if there are no steps
+    """
+    
+    if last_step is None:
+        return None
+    return 'T' if last_step[0][-1:]=='C' else 'A'
+
+
+def rs3_header(header, last_step):
+    """
+    First three rows of the RS3 file
+    
+    Input
+    ----------
+    Header: list with the header and its relevant data
+    last_step: fields of the last demagnetization step (None if there are
+        no steps). It tells if the demagnetization was thermal or AF
+    
+    Returns
+    -------
+    rows: the three rows
+    treat: 'T' (thermal) or 'A' (AF), None if there are no steps
+    """
+    
+    name=header[0]
+    az=header[4]
+    pl=header[5]
+    dipdir=header[6]
+    if header[8]==0:
+        dip=header[7]
+    else:
+        dip=str(180-int(header[7]))
+    
+    datos_muestra=[SPECIMEN_TEMPLATE.format(name, az, pl, dipdir, dip)]
+    
+    treat=rs3_treat(last_step)
+    if treat=='A':
+        unidades='Step[mT]'
+    else: unidades='Step[°C]'
+    
+    header_2=[STEP_HEADER_TEMPLATE.format(unidades)]
+    
+    return [[HEADER_1], datos_muestra, header_2], treat
+
+
+def rs3_values(dato, treat):
+    """
+    ID, step and M[A/m] of one demagnetization step, as written in the RS3 row
+    """
+    
+    if dato[0]=='NRM':
+        id='N'
+        step=0
+    else:
+        if treat=='T':
+            id='T'
+            step=dato[0][:-1]
+        else:
+            id='A'
+            step=dato[0][:-4]
+    
+    mag=format(float(dato[8])*1000, "1e")
+    
+    return id, step, mag
+
+
+def rs3_step(dato, treat):
+    """
+    Row of one demagnetization step
+    """
+    
+    id, step, mag=rs3_values(dato, treat)
+    
+    return [STEP_TEMPLATE.format(id, step, mag, dato[1], dato[2], dato[3], dato[4], dato[5], dato[6])]
+
+
+def format_RS3(header, data):
+    """
+    Function to convert raw data from the conv function into the RS3 format
+    
+    Input (output of the conv program)
+    ----------
+    Header: list with the header and its relevant data
+    Data: data related to each demagnetization step, a list of lists or
+        the Steps of paleoconv.dat2g (read one at a time)
+    
+    Yields
+    -------
+    rows of the file in RS3 format
+    
+    """
+    
+    # print('Len_data: ', len(data))
+    rows, treat=rs3_header(header, data[-1] if len(data)>0 else None)
+    yield from rows
+    
+    for dato in data:
+        yield rs3_step(dato, treat)
+
+
+def rs3_line(row):
+    """
+    Text of one row (a list with one string), quoted as csv.writer does
+    when the row contains a comma, quotes or line breaks
+    """
+    
+    line=row[0]
+    if ',' in line or '"' in line or '\r' in line or '\n' in line:
+        line='"'+line.replace('"', '""')+'"'
+    
+    return line+LINE_END
+
+
+def rs3_text(out_RS3):
+    """
+    Whole content of the RS3 file from its rows
+    """
+    
+    return ''.join([rs3_line(row) for row in out_RS3])
+
+
+def write_RS3(out_RS3, name_RS3):
+    """
+    Writes the rows of format_RS3 in the file 'name_RS3', with a single write.
+    Output: number of characters written
+    """
+    
+    with open(name_RS3, 'w', encoding="cp1252") as file_out:
+        return file_out.write(rs3_text(out_RS3))
+
+
+# Columns (name, start, end) of the specimen row and of the step rows,
+# as written by format_RS3
+SPECIMEN_COLUMNS=[('name', 0, 74), ('sdec', 74, 80), ('sinc', 80, 86),
+                  ('bdec', 86, 92), ('binc', 92, 110)]
+STEP_COLUMNS=[('id', 0, 3), ('step', 3, 6), ('m', 6, 27),
+              ('dsp', 27, 33), ('isp', 33, 39), ('dge', 39, 45), ('ige', 45, 51),
+              ('dtc', 51, 57), ('itc', 57, 63), ('prec', 63, 81), ('note', 81, None)]
+STEP_TYPES={'id': 'U1', 'step': 'U8', 'note': 'U45'}
+
+
+def _split_step(line):
+    """
+    Text of each column of a step row. A step longer than its 3 characters
+    moves the rest of the row to the right, so the columns after it are
+    moved as well
+    """
+    
+    step_end=line.find(' ', 3)
+    shift=max(step_end-6, 0) if step_end!=-1 else 0
+    
+    row=[line[0:3].strip(), line[3:6+shift].strip()]
+    for name, start, end in STEP_COLUMNS[2:]:
+        end=None if end is None else end+shift
+        row.append(line[start+shift:end].strip())
+    
+    return row
+
+
+def read_RS3_text(file_name):
+    """
+    Reads a RS3 file in a single pass, following the fixed width columns
+    
+    Output:
+        specimen: dictionary with the text of name, sdec, sinc, bdec and binc
+        steps: list with the text of the columns (STEP_COLUMNS) of each step
+    """
+    
+    with open(file_name, 'r', encoding="cp1252", newline='') as f:
+        return parse_RS3_text(f.read())
+
+
+def parse_RS3_text(text):
+    """
+    Same as read_RS3_text, for the content of the file (e.g. read from an archive)
+    """
+    
+    lines=text.splitlines()
+    specimen={}
+    if len(lines)>1:
+        specimen={name: lines[1][start:end].strip() for name, start, end in SPECIMEN_COLUMNS}
+    steps=[_split_step(line) for line in lines[3:] if line.strip()]
+    
+    return specimen, steps
+
+
+def read_RS3(file_name):
+    """
+    Reads a RS3 file with typed columns (requires NumPy)
+    
+    Output:
+        specimen: dictionary with the name (text) and sdec, sinc, bdec, binc (float)
+        steps: structured array with one field per column of STEP_COLUMNS
+            (NaN for the numbers that are missing)
+    """
+    
+    import numpy as np
+    
+    specimen, rows=read_RS3_text(file_name)
+    for key in ('sdec', 'sinc', 'bdec', 'binc'):
+        if key in specimen:
+            specimen[key]=_to_float(specimen[key])
+    
+    dtype=[(name, STEP_TYPES.get(name, 'f8')) for name, start, end in STEP_COLUMNS]
+    steps=np.array([tuple(value if name in STEP_TYPES else _to_float(value)
+                          for (name, start, end), value in zip(STEP_COLUMNS, row))
+                    for row in rows], dtype=dtype)
+    
+    return specimen, steps
+
+
+def _to_float(value):
+    """
+    float(value), or NaN if it is empty or not a number
+    """
+    
+    try:
+        return float(value)
+    except ValueError:
+        return float('nan')
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Search of the input files in a folder or in a whole tree of folders.
+
+The folders are read with os.scandir, one level of the tree at a time, and
+the folders of each level are read in parallel by a pool of threads (the
+time goes to the file system, e.g. a network share, not to Python).
+The files and folders can be selected with include/exclude globs.
+"""
+
+from fnmatch import fnmatch
+import os
+
+
+def _relative(path, root):
+    """
+    Path relative to 'root', with '/' as separator (for the globs)
+    """
+    
+    return os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def matches(rel_path, patterns):
+    """
+    True if the relative path, or only the name, matches any of the globs
+    """
+    
+    name=rel_path.rsplit('/', 1)[-1]
+    return any(fnmatch(rel_path, pattern) or fnmatch(name, pattern) for pattern in patterns)
+
+
+def selected(rel_path, include=(), exclude=()):
+    """
+    True if the file is not excluded and, when there are include globs,
+    matches any of them
+    """
+    
+    if exclude and matches(rel_path, exclude):
+        return False
+    return not include or matches(rel_path, include)
+
+
+def _read_folder(folder, ext):
+    """
+    Files with the extension 'ext' and subfolders of 'folder'
+    """
+    
+    files=[]
+    folders=[]
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(ext) and entry.is_file():
+                    files.append(entry.path)
+                elif entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.path)
+    except OSError as error:
+        print(f'Warning!!! {folder} cannot be read: {error}')
+    
+    return files, folders
+
+
+def scan_tree(root, ext='.dat', include=(), exclude=(), recursive=True, threads=8):
+    """
+    Searches the files with the extension 'ext' in 'root' and its subfolders
+    
+    Input:
+        root: first folder
+        ext: extension of the files
+        include, exclude: globs of the files to convert and of the files and
+            folders to skip. They are matched with the path relative to 'root'
+            (e.g. '2019/*') and with the name alone (e.g. 'BU*.dat')
+        recursive: if False, only the files of 'root' are searched
+        threads: number of folders read at the same time
+    Output:
+        List with the path of the files, sorted by folder and by name, so the
+        files of each folder are together
+    """
+    
+    found=[]
+    level=[root]
+    pool=None
+    try:
+        while level:
+            if pool is None and len(level)>1 and threads>1:
+                from concurrent.futures import ThreadPoolExecutor
+                pool=ThreadPoolExecutor(max_workers=threads)
+            if pool is None:
+                results=[_read_folder(folder, ext) for folder in level]
+            else:
+                results=pool.map(_read_folder, level, [ext]*len(level))
+            
+            next_level=[]
+            for files, folders in results:
+                if include or exclude:
+                    files=[file for file in files if selected(_relative(file, root), include, exclude)]
+                found+=files
+                if recursive:
+                    next_level+=[folder for folder in folders
+                                 if not (exclude and matches(_relative(folder, root), exclude))]
+            level=next_level
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    return sorted(found, key=lambda file: (os.path.dirname(file), os.path.basename(file)))
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Lazy specimens of the 2G *.dat files, and selection of specimens and steps.
+
+The header of a Specimen is decoded when the file is opened, and its steps
+only when they are used. A Selection (specimens by name prefix or by type
+of demagnetization, steps by label) is pushed down into the parser: the
+files of the specimens that are not selected are not read after the
+header, and the steps that are not selected are not decoded (only their
+label is read to select them).
+
+Usage:
+    for spec in iter_specimens(files, Selection(names=['BU1'], steps=['NRM', '*C'])):
+        print(spec.name, len(spec.steps), spec.steps.labels())
+"""
+
+from fnmatch import translate
+import re
+
+from paleoconv.dat2g import decode_header, Steps, NAME_POS, OVER_POS
+
+
+# Bytes of the header (the last field is the overturned flag)
+HEADER_SIZE=OVER_POS+1
+DEMAG_TYPES=('thermal', 'AF', 'NRM')
+
+
+def demag_type(label):
+    """
+    Type of demagnetization from the label of the last step, as
+    format_RS3 decides it: 'thermal' (100C), 'AF' (20mT) or 'NRM'
+    """
+    
+    if label is None:
+        return None
+    if label=='NRM':
+        return 'NRM'
+    if label[-1:]=='C':
+        return 'thermal'
+    if label[-2:]=='mT':
+        return 'AF'
+    return None
+
+
+class Selection:
+    """
+    Specimens and steps to convert. Each filter that is empty selects all
+    
+    Input:
+        names: prefixes of the names of the specimens (name of the header)
+        steps: labels of the steps to keep, or globs (e.g. 'NRM', '100C', '*mT')
+        demag: type of demagnetization of the specimens, 'thermal', 'AF' or
+            'NRM', from the last step of the file (see demag_type)
+    """
+    
+    def __init__(self, names=(), steps=(), demag=None):
+        self.names=tuple(names)
+        self.steps=tuple(steps)
+        self.demag=demag
+        # All the globs of the steps in a single regular expression
+        self._steps=re.compile('|'.join(translate(step) for step in self.steps)) if self.steps else None
+    
+    def __repr__(self):
+        return f'Selection(names={self.names!r}, steps={self.steps!r}, demag={self.demag!r})'
+    
+    def __bool__(self):
+        return bool(self.names or self.steps or self.demag)
+    
+    @property
+    def specimens(self):
+        """
+        True if the selection leaves out specimens (by name or demagnetization)
+        """
+        
+        return bool(self.names or self.demag)
+    
+    def match_name(self, name):
+        return not self.names or name.startswith(self.names)
+    
+    def match_step(self, label):
+        return self._steps is None or self._steps.match(label) is not None
+    
+    def match_demag(self, steps):
+        """
+        True if the specimen with these Steps (all of them) has the type of
+        demagnetization of the selection. Only the last label is decoded
+        """
+        
+        if self.demag is None:
+            return True
+        last=steps[-1] if len(steps)>0 else None
+        return demag_type(last[0] if last else None)==self.demag
+    
+    @property
+    def keep(self):
+        """
+        Function for the 'keep' argument of paleoconv.dat2g.Steps, None if
+        all the steps are selected
+        """
+        
+        return self.match_step if self.steps else None
+
+
+class Specimen:
+    """
+    Specimen of a 2G *.dat file. The fields of the header are attributes
+    (name, vol, cc, gm, az, pl, dd, dip, over, date, as in conv) and 'steps'
+    is a paleoconv.dat2g.Steps with the selected steps, that is only built
+    (and decoded, step by step) when it is used
+    """
+    
+    __slots__=('file', 'name', 'vol', 'cc', 'gm', 'az', 'pl', 'dd', 'dip', 'over', 'date',
+               '_buf', '_keep', '_steps')
+    
+    def __init__(self, buf, file=None, keep=None):
+        (self.name, self.vol, self.cc, self.gm, self.az, self.pl, self.dd, self.dip,
+         self.over, self.date)=decode_header(buf)
+        self.file=file
+        self._buf=buf
+        self._keep=keep
+        self._steps=None
+    
+    def __repr__(self):
+        return f'Specimen({self.name!r}, {self.file!r})'
+    
+    @property
+    def steps(self):
+        if self._steps is None:
+            self._steps=Steps(self._buf, self._keep)
+        return self._steps
+    
+    def header(self):
+        """
+        Header as the list returned by conv
+        """
+        
+        return [self.name, self.vol, self.cc, self.gm, self.az, self.pl, self.dd,
+                self.dip, self.over, self.date]
+
+
+def is_selected(buf, selection):
+    """
+    True if the specimen of the content 'buf' of a *.dat file is selected
+    by name and demagnetization. Only the header and the last label are decoded
+    """
+    
+    return selection.match_name(decode_header(buf)[0]) and selection.match_demag(Steps(buf))
+
+
+def open_specimen(file_name, selection=None):
+    """
+    Opens a *.dat file as a Specimen, if it is selected
+    
+    Input:
+        file_name: name of the *.dat file
+        selection: Selection (None: all the specimens and steps)
+    Output:
+        Specimen, or None if the specimen is not selected. The rest of the
+        file is not read when the name of the specimen is not selected
+    """
+    
+    with open(file_name, 'rb') as f:
+        buf=f.read(HEADER_SIZE)
+        name=decode_header(buf)[0]
+        # The name can go on after the bytes read if it reaches their end
+        if (selection is not None and NAME_POS+len(name)<len(buf) and
+                not selection.match_name(name)):
+            return None
+        buf+=f.read()
+    if selection is None:
+        return Specimen(buf, file_name)
+    if not is_selected(buf, selection):
+        return None
+    
+    return Specimen(buf, file_name, selection.keep)
+
+
+def iter_specimens(files, selection=None):
+    """
+    Generator with the selected specimens of the files, opened one at a time
+    """
+    
+    for file in files:
+        spec=open_specimen(file, selection)
+        if spec is not None:
+            yield spec
+
+
+def select_specimens(files, selection, threads=8):
+    """
+    Files of the specimens selected by name and demagnetization, reading
+    several of them at the same time. Only the headers (and the last
+    label, for the demagnetization) are decoded
+    Output:
+        list with the selected files, in the order of 'files'. The files that
+        cannot be read are kept, so that the conversion reports them
+    """
+    
+    def selected(file):
+        try:
+            return open_specimen(file, selection) is not None
+        except OSError:
+            return True
+    
+    if threads>1 and len(files)>1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            keep=list(pool.map(selected, files))
+    else:
+        keep=[selected(file) for file in files]
+    
+    return [file for file, k in zip(files, keep) if k]
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Columnar model of a collection of 2G specimens.
+
+All the steps of all the specimens are kept in a single NumPy structured
+array (STEP_DTYPE), with one typed column per field of the 2G step, and
+each specimen has a SpecimenHeader with the rows of its steps. The text
+of the *.dat files is parsed only once, when the collection is filled,
+so the writers and checks work with the typed values.
+
+A collection can be saved in a single binary file (Collection.save), with
+one column per step field and per header field, and opened again in a few
+milliseconds with load_collection: the file is a standard uncompressed
+NumPy .npz file, and its columns are mapped into memory (mmap) instead of
+being read.
+"""
+
+import mmap
+import os
+import zipfile
+
+import numpy as np
+
+from paleoconv.dat2g import read_dat, decode_header, Steps
+from paleoconv.timestamps import parse_time, parse_times
+
+
+# The 26 fields of a step: name of the column and type
+STEP_FIELDS=[('step', 'S10'),                            # DEMAG: NRM, 100C, 20mT...
+             ('cd', 'f4'), ('ci', 'f4'),                 # specimen direction
+             ('isd', 'f4'), ('isi', 'f4'),               # geographic direction
+             ('rd', 'f4'), ('ri', 'f4'),                 # tilt corrected direction
+             ('m', 'f8'), ('j', 'f8'),
+             ('x', 'f8'), ('sx', 'f4'), ('nx', 'f4'), ('ex', 'f4'),
+             ('y', 'f8'), ('sy', 'f4'), ('ny', 'f4'), ('ey', 'f4'),
+             ('z', 'f8'), ('sz', 'f4'), ('nz', 'f4'), ('ez', 'f4'),
+             ('sn', 'f4'), ('sd', 'f4'), ('sh', 'f4'),
+             ('extra', 'S12'),
+             ('time', 'datetime64[s]')]
+STEP_DTYPE=np.dtype(STEP_FIELDS)
+
+
+# Header fields: text fields are kept as text, so that header() gives the
+# same values as conv. The numeric ones are also saved as numbers
+HEADER_TEXT=('name', 'vol', 'az', 'pl', 'dd', 'dip', 'date', 'file')
+HEADER_FLAGS=('cc', 'gm', 'over')
+HEADER_NUMBERS=('vol', 'az', 'pl', 'dd', 'dip')
+
+# Version of the layout of the saved collections
+COLLECTION_VERSION=1
+
+
+def _float(value):
+    """
+    float(value), or NaN if the field is not a number
+    """
+    
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def step_record(dato):
+    """
+    Typed tuple of one step (list of text fields, output of dat2g).
+    The time is left empty (NaT): it is filled for all the steps at
+    once with paleoconv.timestamps.parse_times
+    """
+    
+    dato=list(dato)+['']*(len(STEP_FIELDS)-len(dato))
+    
+    # Fields 1 to 23 are numbers
+    return (dato[0].encode('ascii', 'replace'), *[_float(value) for value in dato[1:24]],
+            dato[24].encode('ascii', 'replace'), 'NaT')
+
+
+class SpecimenHeader:
+    """
+    Header of one specimen, as decoded from the 2G file, and the rows
+    [start, stop) of its steps in the steps array of the collection
+    """
+    
+    __slots__=('name', 'vol', 'cc', 'gm', 'az', 'pl', 'dd', 'dip', 'over', 'date',
+               'file', 'start', 'stop')
+    
+    def __init__(self, header, file=None, start=0, stop=0):
+        (self.name, self.vol, self.cc, self.gm, self.az, self.pl, self.dd, self.dip,
+         self.over, self.date)=header
+        self.file=file
+        self.start=start
+        self.stop=stop
+    
+    def __repr__(self):
+        return f'SpecimenHeader({self.name!r}, {self.stop-self.start} steps)'
+    
+    @property
+    def n_steps(self):
+        return self.stop-self.start
+    
+    @property
+    def time(self):
+        """
+        Date of the header as datetime (None if it cannot be read)
+        """
+        
+        return parse_time(self.date)
+    
+    def header(self):
+        """
+        Header as the list returned by conv
+        """
+        
+        return [self.name, self.vol, self.cc, self.gm, self.az, self.pl, self.dd,
+                self.dip, self.over, self.date]
+
+
+class Collection:
+    """
+    Specimens of a collection: a list of SpecimenHeader and one structured
+    array with the steps of all of them, in the same order.
+    
+    The collections opened with load_collection keep the headers as columns
+    ('columns': dictionary field -> array) and the SpecimenHeader objects
+    are only built when 'specimens' is used
+    """
+    
+    def __init__(self, specimens, steps, columns=None):
+        self._specimens=specimens
+        self.steps=steps
+        self.columns=columns
+    
+    @classmethod
+    def from_files(cls, files, keep=None):
+        """
+        Reads and parses the *.dat files, once. 'keep' selects the steps
+        (see paleoconv.specimen.Selection.keep)
+        """
+        
+        specimens=[]
+        blocks=[]
+        times=[]
+        start=0
+        for file in files:
+            buf=read_dat(file)
+            data=list(Steps(buf, keep))
+            steps=np.array([step_record(dato) for dato in data], dtype=STEP_DTYPE)
+            times.extend(dato[25] if len(dato)>25 else '' for dato in data)
+            specimens.append(SpecimenHeader(decode_header(buf), file, start, start+len(steps)))
+            blocks.append(steps)
+            start+=len(steps)
+        
+        steps=np.concatenate(blocks) if blocks else np.empty(0, dtype=STEP_DTYPE)
+        # All the dates of the collection in one batch
+        steps['time']=parse_times(times)
+        return cls(specimens, steps)
+    
+    @property
+    def specimens(self):
+        if self._specimens is None:
+            c=self.columns
+            fields=[c[field].tolist() for field in ('name', 'vol', 'cc', 'gm', 'az', 'pl',
+                                                    'dd', 'dip', 'over', 'date')]
+            self._specimens=[SpecimenHeader(header, file, start, stop)
+                             for header, file, start, stop
+                             in zip(zip(*fields), c['file'].tolist(), c['start'].tolist(),
+                                    c['stop'].tolist())]
+        return self._specimens
+    
+    def __len__(self):
+        if self._specimens is None:
+            return len(self.columns['name'])
+        return len(self._specimens)
+    
+    def __iter__(self):
+        """
+        (SpecimenHeader, steps of the specimen) of each specimen
+        """
+        
+        for spec in self.specimens:
+            yield spec, self.steps[spec.start:spec.stop]
+    
+    @property
+    def index(self):
+        """
+        Specimen (position in self.specimens) of each step
+        """
+        
+        if self._specimens is None:
+            return np.repeat(np.arange(len(self)), self.columns['stop']-self.columns['start'])
+        return np.repeat(np.arange(len(self.specimens)),
+                         [spec.n_steps for spec in self.specimens])
+    
+    def header_times(self):
+        """
+        Array with the date of the header of each specimen (datetime64)
+        """
+        
+        if self._specimens is None:
+            return np.asarray(self.columns['time'])
+        return parse_times([spec.date for spec in self.specimens])
+    
+    def header_column(self, field):
+        """
+        Array with a numeric field of the headers (e.g. 'az'), NaN if missing
+        """
+        
+        if self._specimens is None:
+            if field in HEADER_NUMBERS:
+                return np.asarray(self.columns['num_'+field])
+            return np.asarray(self.columns[field], dtype=float)
+        return np.array([_float(getattr(spec, field)) for spec in self.specimens], dtype=float)
+    
+    def header_columns(self):
+        """
+        Dictionary with one array per header field: the fields of the
+        SpecimenHeader, the numeric fields as numbers ('num_az'...) and
+        the date as datetime64 ('time')
+        """
+        
+        if self._specimens is None:
+            return dict(self.columns)
+        
+        columns={}
+        for field in HEADER_TEXT:
+            columns[field]=np.array([str(getattr(spec, field) or '') for spec in self.specimens],
+                                    dtype=str)
+        for field in HEADER_FLAGS:
+            columns[field]=np.array([getattr(spec, field) for spec in self.specimens], dtype='i1')
+        for field in HEADER_NUMBERS:
+            columns['num_'+field]=self.header_column(field)
+        columns['start']=np.array([spec.start for spec in self.specimens], dtype='i8')
+        columns['stop']=np.array([spec.stop for spec in self.specimens], dtype='i8')
+        columns['time']=self.header_times()
+        
+        return columns
+    
+    def save(self, file_name):
+        """
+        Saves the collection in a single binary file (uncompressed .npz):
+        one array per header field ('spec_name'...) and per step field
+        ('step_cd'...), that load_collection maps into memory
+        """
+        
+        arrays={'version': np.array(COLLECTION_VERSION)}
+        for field, column in self.header_columns().items():
+            arrays['spec_'+field]=column
+        for field in self.steps.dtype.names:
+            arrays['step_'+field]=self.steps[field]
+        
+        # Written with another name and renamed at the end, so that an
+        # interrupted export does not leave a broken file
+        tmp=file_name+'.part'
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, file_name)
+
+
+def _member_offsets(f):
+    """
+    Position of the data of each array of an uncompressed .npz file
+    Output:
+        dictionary name -> (dtype, shape, offset)
+    """
+    
+    offsets={}
+    with zipfile.ZipFile(f) as zf:
+        for info in zf.infolist():
+            if info.compress_type!=zipfile.ZIP_STORED:
+                raise ValueError(f'{info.filename} is compressed and cannot be mapped')
+            # Local header: 30 bytes, then the name and the extra field
+            f.seek(info.header_offset+26)
+            name_len, extra_len=np.frombuffer(f.read(4), dtype='<u2').tolist()
+            f.seek(info.header_offset+30+name_len+extra_len)
+            version=np.lib.format.read_magic(f)
+            if version==(1, 0):
+                shape, fortran, dtype=np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype=np.lib.format.read_array_header_2_0(f)
+            offsets[info.filename[:-4]]=(dtype, shape, f.tell())
+    
+    return offsets
+
+
+class StepColumns:
+    """
+    Steps of a loaded collection: one array per field. It is used as the
+    structured array of Collection.from_files: steps['cd'], len(steps) and
+    steps[start:stop]
+    """
+    
+    def __init__(self, columns):
+        self._columns=columns
+        self.dtype=np.dtype([(name, columns[name].dtype) for name in columns])
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._columns[key]
+        return StepColumns({name: column[key] for name, column in self._columns.items()})
+    
+    def __len__(self):
+        return len(next(iter(self._columns.values()))) if self._columns else 0
+    
+    def to_array(self):
+        """
+        Copy of the steps as a structured array (STEP_DTYPE)
+        """
+        
+        out=np.empty(len(self), dtype=self.dtype)
+        for name, column in self._columns.items():
+            out[name]=column
+        return out
+
+
+def load_collection(file_name, mmap_mode=True):
+    """
+    Opens a collection saved with Collection.save
+    
+    Input:
+        file_name: name of the file
+        mmap_mode: if True, the columns are mapped into memory and only the
+            parts that are used are read from the disk. If False, the file
+            is read into memory
+    Output:
+        Collection, with the steps as StepColumns (read-only arrays)
+    """
+    
+    with open(file_name, 'rb') as f:
+        offsets=_member_offsets(f)
+        if mmap_mode:
+            buf=mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f.seek(0)
+            buf=f.read()
+    
+    arrays={name: np.ndarray(shape, dtype, buffer=buf, offset=offset)
+            for name, (dtype, shape, offset) in offsets.items()}
+    if 'version' not in arrays or int(arrays['version'])>COLLECTION_VERSION:
+        raise ValueError(f'{file_name} is not a collection saved by this version')
+    
+    columns={name[5:]: array for name, array in arrays.items() if name.startswith('spec_')}
+    steps=StepColumns({name[5:]: array for name, array in arrays.items()
+                       if name.startswith('step_')})
+    
+    return Collection(None, steps, columns)
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablo
+
+Thellier-tool (*.tdt) output.
+
+The checks (steps ending in 2) are moved to the positions given by the
+user in a single pass over the steps, and the check positions and the
+laboratory field of each specimen can be read from a configuration file,
+so that many specimens can be converted without answering any question.
+
+The *.tdt files can also be made directly from the 2G *.dat files
+(--from-dat): the steps are taken from the decoded *.dat file, with the
+same values that the *.rs3 file would have, so the *.rs3 file is neither
+written nor read again (unless --keep-rs3 is given).
+"""
+
+import argparse
+import csv
+from functools import partial
+import io
+import os
+import sys
+
+from paleoconv.batch import run_batch, iter_batch, add_jobs_argument
+from paleoconv.dat2g import read_dat, decode_header, Steps
+from paleoconv.rs3 import (read_RS3_text, parse_RS3_text, rs3_treat, rs3_values, format_RS3,
+                           rs3_text)
+from paleoconv.scan import scan_tree
+from paleoconv.archive import is_archive, archive_stem, iter_members, open_sink
+
+
+# Fields of the 2G steps used in the TDT files: step, Dsp, Isp and M
+TDT_FIELDS=(0, 1, 2, 8)
+
+
+def order_checks(data, checks_pos, file_name):
+    '''
+    Moves the checks (steps ending in 2) to the given positions
+    
+    Input:
+        data: list with the rows of the steps (the first column is the step)
+        checks_pos: positions (1 = first row, NRM excluded) of the checks,
+            in the order in which they were measured
+        file_name: name of the file, for the messages
+    Output:
+        List with the rows in their final order
+    '''
+    
+    name=file_name[:-4]
+    
+    # Collecting checks (ending in 2) apart from the main data list
+    rows=[]
+    checks_data=[]
+    for dato in data:
+        if dato[0][-1]=='2':
+            checks_data.append(dato)
+        else:
+            rows.append(dato)
+    
+    if len(checks_data)!=len(checks_pos):
+        print(f'\nThe file {file_name} contains {len(checks_data)} checks but {len(checks_pos)} was/were expected')
+        print('The number of checks (steps ending in 2) and the number of indicated positions should be the same\n')
+        return rows+checks_data
+    
+    # Final position of each check. Each check is inserted in the list that
+    # already has the previous ones, so they move when a later check is
+    # inserted before them. Negative positions count from the end, as in np.insert
+    placed=[]
+    at_end=[]
+    for check, pos in zip(checks_data, checks_pos):
+        size=len(rows)+len(placed)
+        try:
+            index=int(pos)-1
+            if index<0:
+                index+=size
+            if not 0<=index<=size:
+                raise IndexError(pos)
+        except (IndexError, ValueError):
+            at_end.append(check)
+            print(f'\nWarning!!! Problems adding the check {check[0]} in {name}')
+            print('It is added at the end of the file\n')
+            continue
+        placed=[(p+1 if p>=index else p, c) for p, c in placed]
+        placed.append((index, check))
+    
+    # Building the final list in one pass
+    out=[None]*(len(rows)+len(placed))
+    for index, check in placed:
+        out[index]=check
+    rows=iter(rows)
+    for i in range(len(out)):
+        if out[i] is None:
+            out[i]=next(rows)
+    
+    return out+at_end
+
+
+def tdt_rows(name, data, checks_pos, lab_field, file_name=None):
+    '''
+    Rows of the TDT file of one specimen
+    
+    Input:
+        name: name of the specimen
+        data: rows [step, M, Dec, Inc] of the steps, without the NRM
+        checks_pos: positions of the checks (see order_checks)
+        lab_field: laboratory field (µT), as text
+        file_name: name of the input file, for the messages
+    '''
+    
+    data=order_checks(data, checks_pos, file_name or name+'.rs3')
+    
+    # Adding the code to each step depending on the type of measurement,
+    # and the specimen name as the first column
+    out=[[name, f'{dato[0][:2]}0.{dato[0][2:]}0']+list(dato[1:]) for dato in data]
+    
+    # Adding header according to TDT files
+    header=[['Thellier-tdt','' ,'' ,'' ,''], [lab_field, '0.0', '0.0', '0.0', '0.0']]
+    
+    return header+out
+
+
+def tdt_text(out_tdt):
+    '''
+    Text of the TDT file with the rows of tdt_rows
+    '''
+    
+    text=io.StringIO()
+    writer=csv.writer(text,delimiter='\t', lineterminator='\n')
+    writer.writerows(out_tdt)
+    
+    return text.getvalue()
+
+
+def write_tdt(out_tdt, name_tdt):
+    '''
+    Writes the rows of tdt_rows in the file 'name_tdt'
+    '''
+    
+    with open(name_tdt, 'w') as file_out:
+        file_out.write(tdt_text(out_tdt))
+
+
+def lab_field_text(value):
+    '''
+    Laboratory field as written in the TDT files (one decimal).
+    Raises ValueError if it is not a number
+    '''
+    
+    return f'{float(value):.1f}'
+
+
+def parse_checks(text):
+    '''
+    List of check positions from a text like '3,7' (empty text: no checks)
+    '''
+    
+    text=text.strip()
+    return [pos.strip() for pos in text.split(',')] if text!='' else []
+
+
+def read_tdt_config(file_name):
+    '''
+    Reads the check positions and the laboratory field of each specimen
+    
+    The file is a CSV file with the columns specimen, lab_field and checks,
+    with a header line, e.g.:
+        specimen,lab_field,checks
+        BU-01A,40,"3,7"
+        BU-02A,30,
+        *,40,"3,7"
+    The specimen '*' gives the values of the specimens that are not in the file.
+    
+    Output:
+        Dictionary specimen -> (checks_pos, lab_field)
+    '''
+    
+    config={}
+    with open(file_name, 'r', newline='', encoding='utf-8-sig') as f:
+        for line, row in enumerate(csv.DictReader(f), 2):
+            try:
+                specimen=row['specimen'].strip()
+                lab_field=lab_field_text(row['lab_field'])
+            except (KeyError, AttributeError, TypeError, ValueError):
+                raise ValueError(f'{file_name}, line {line}: a specimen and a valid '
+                                 'lab_field are needed') from None
+            config[specimen]=(parse_checks(row.get('checks') or ''), lab_field)
+    
+    return config
+
+
+def filename(folder='.', recursive=False, include=(), exclude=(), ext='.rs3'):
+    """
+    Gets the name of .rs3 files (or of the files with the extension 'ext')
+    present in 'folder' (and in its subfolders if 'recursive'), selected with
+    the include/exclude globs (see paleoconv.scan)
+    Output:
+        List with the path of each *.rs3 file (only the name for the current folder)
+    """
+    
+    files_name=scan_tree(folder, ext, include, exclude, recursive)
+    if folder=='.':
+        files_name=[f[2:] for f in files_name]
+    print(f'\n{len(files_name)} *{ext} files found\n')
+    
+    return files_name
+
+
+def getRS3(filename, text=None):
+    '''
+    Gets the data from the rs3 file without the header, and only selects the necessary columns.
+    If 'text' is given, it is the content of the file (e.g. read from an archive)
+    Output:
+        List with the data from each file used in to_TDT
+    '''
+    
+    # The file is read in one pass following the fixed width columns of the RS3 format.
+    # Data is saved in "data", without the header and without the NRM measurement
+    # If you want to keep the NRM, change steps[1:] to steps
+    if text is None:
+        specimen, steps=read_RS3_text(filename)
+    else:
+        specimen, steps=parse_RS3_text(text)
+    
+    # Columns Step, M, Dsp and Isp
+    data2=[row[1:5] for row in steps[1:]]
+    
+    return data2
+
+
+def getDAT(data):
+    '''
+    Same as getRS3, from the steps of a 2G *.dat file (paleoconv.dat2g.Steps
+    or output of conv) instead of the *.rs3 file written with them
+    Output:
+        List with the columns Step, M, Dsp and Isp of each step but the first one
+    '''
+    
+    treat=rs3_treat(data[-1] if len(data)>0 else None)
+    if isinstance(data, Steps):
+        # Only the fields that go to the TDT file are decoded
+        data=data.iter_fields(TDT_FIELDS)
+    
+    data2=[]
+    for i, dato in enumerate(data):
+        if i>0:
+            id, step, mag=rs3_values(dato, treat)
+            data2.append([str(step).strip(), mag, dato[1].strip(), dato[2].strip()])
+    
+    return data2
+
+
+def to_TDT(file_name, checks_pos, lab_field, text=None, data=None):
+    '''
+    Function to generate the file in TDT format.
+    With 'data' (getDAT of a *.dat file), the *.rs3 file is not read
+    '''
+    
+    if data is None:
+        data=getRS3(file_name, text)
+    name=os.path.basename(file_name)[:-4]
+    
+    # Informing the user of the number of records per file
+    print(f'{name} has {str(len(data))} records')
+    
+    # Checks in their positions, step codes, specimen name and header
+    return tdt_rows(name, data, checks_pos, lab_field, file_name)
+
+
+def specimen_settings(name, checks_pos, lab_field, config):
+    """
+    Check positions and lab field of the specimen 'name': the ones of 'config'
+    (output of read_tdt_config) if it is given, or checks_pos and lab_field.
+    Output:
+        (checks_pos, lab_field), or None if the specimen has no configuration
+    """
+    
+    if config is not None:
+        if name in config:
+            return config[name]
+        if '*' in config:
+            return config['*']
+        if lab_field is None:
+            print(f'\nWarning!!! {name} is not in the configuration file. It is not converted\n')
+            return None
+    
+    return checks_pos, lab_field
+
+
+def dat_TDT(file_name, checks_pos, lab_field, buf=None, keep_rs3=None):
+    """
+    TDT rows of a 2G *.dat file, without an intermediate *.rs3 file
+    
+    Input:
+        buf: content of the file (it is read if None)
+        keep_rs3: function(text) that writes the *.rs3 file, if it is also wanted
+    """
+    
+    if buf is None:
+        buf=read_dat(file_name)
+    steps=Steps(buf)
+    if keep_rs3 is not None:
+        keep_rs3(rs3_text(format_RS3(decode_header(buf), steps)))
+    
+    return to_TDT(file_name, checks_pos, lab_field, data=getDAT(steps))
+
+
+def _write_rs3(name_rs3, text):
+    with open(name_rs3, 'w', encoding='cp1252') as f:
+        f.write(text)
+
+
+def tdt_file(file, checks_pos, lab_field, config=None, folder='.', output=None, keep_rs3=False):
+    """
+    Converts one *.rs3 file (or 2G *.dat file) and writes the *.tdt file next to it.
+    With 'config' (output of read_tdt_config) the check positions and the lab
+    field of the specimen are taken from it. With 'output', the *.tdt file is
+    written in the same subfolder of 'output' as the input file in 'folder'.
+    With 'keep_rs3', the *.rs3 file of a *.dat file is also written
+    Output:
+        Name of the *.tdt file, or None if the specimen has no configuration
+    """
+    
+    settings=specimen_settings(os.path.basename(file)[:-4], checks_pos, lab_field, config)
+    if settings is None:
+        return None
+    
+    name_tdt=file[:-3]+'tdt'
+    if output is not None:
+        name_tdt=os.path.join(output, os.path.relpath(name_tdt, folder))
+        os.makedirs(os.path.dirname(name_tdt), exist_ok=True)
+    if file.endswith('.dat'):
+        out_tdt=dat_TDT(file, *settings,
+                        keep_rs3=partial(_write_rs3, name_tdt[:-3]+'rs3') if keep_rs3 else None)
+    else:
+        out_tdt=to_TDT(file, *settings)
+    write_tdt(out_tdt, name_tdt)
+    
+    return name_tdt
+
+
+def _tdt_member(item):
+    """
+    Converts one *.rs3 (or 2G *.dat) file read from an archive.
+    Input: (name, content in bytes, checks_pos, lab_field, config, keep_rs3)
+    Output: name, text of the *.tdt file (None if it is not converted), text of
+        the *.rs3 file (None if it is not kept)
+    """
+    
+    name, content, checks_pos, lab_field, config, keep_rs3=item
+    settings=specimen_settings(name.rsplit('/', 1)[-1][:-4], checks_pos, lab_field, config)
+    if settings is None:
+        return name, None, None
+    
+    if not name.endswith('.dat'):
+        return name, tdt_text(to_TDT(name, *settings, text=content.decode('cp1252'))), None
+    rs3=[]
+    out_tdt=dat_TDT(name, *settings, buf=content, keep_rs3=rs3.append if keep_rs3 else None)
+    
+    return name, tdt_text(out_tdt), rs3[0] if rs3 else None
+
+
+def tdt_stream(sources, sink, checks_pos, lab_field, config=None, jobs=1, keep_rs3=False):
+    """
+    Converts *.rs3 (or 2G *.dat) files that are read one after the other (e.g.
+    the members of an archive, see paleoconv.archive) and writes the *.tdt
+    files through 'sink' (paleoconv.archive.FolderSink or ArchiveSink)
+    
+    Input:
+        sources: iterable of (name, content): path relative to the sink (with
+            '/' as separator) and content of the file (bytes)
+        keep_rs3: also write the *.rs3 files of the *.dat files
+    Output:
+        Number of *.tdt files written
+    """
+    
+    n=0
+    items=((name, content, checks_pos, lab_field, config, keep_rs3) for name, content in sources)
+    for name, text, text_rs3 in iter_batch(_tdt_member, items, jobs):
+        if text_rs3 is not None:
+            sink.write(name[:-3]+'rs3', text_rs3, 'cp1252')
+        if text is not None:
+            sink.write(name[:-3]+'tdt', text)
+            n+=1
+    
+    return n
+
+
+def _read_file(file):
+    """
+    Content of a file, in bytes
+    """
+    
+    with open(file, 'rb') as f:
+        return f.read()
+
+
+def main(argv=None):
+    """
+    Command line entry point. 'argv' is the list of arguments (sys.argv[1:] if None)
+    """
+    
+    parser=argparse.ArgumentParser(description='Converts Remasoft *.rs3 files (or 2G *.dat '
+                                   'files, with --from-dat) to *.tdt. '
+                                   'Without --lab-field or --config the check positions and '
+                                   'the laboratory field are asked')
+    parser.add_argument('folder', nargs='?', default='.',
+                        help='folder (or zip/tar archive) with the *.rs3 (or *.dat) files '
+                             '(default: the current folder)')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='also convert the *.rs3 files of all the subfolders')
+    parser.add_argument('-o', '--output', default=None, metavar='FOLDER',
+                        help='write the *.tdt files in this folder, or in this zip/tar archive, '
+                             'with the same subfolders as the input folder (default: next to '
+                             'the *.rs3 files, or a folder with the name of the input archive)')
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB',
+                        help='convert only the files that match the glob. Can be repeated')
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help='skip the files and subfolders that match the glob. Can be repeated')
+    parser.add_argument('--from-dat', action='store_true',
+                        help='convert the 2G *.dat files directly, without writing and '
+                             'reading *.rs3 files')
+    parser.add_argument('--keep-rs3', action='store_true',
+                        help='with --from-dat, also write the *.rs3 files')
+    parser.add_argument('--checks', default=None,
+                        help='measurement number(s) of the checks (excluding the NRM), '
+                             'separated by commas, for all the specimens')
+    parser.add_argument('--lab-field', default=None,
+                        help='laboratory field used for the experiments (µT), for all the specimens')
+    parser.add_argument('--config', default=None,
+                        help='CSV file with the columns specimen, lab_field and checks, '
+                             'with the values of each specimen')
+    add_jobs_argument(parser)
+    args=parser.parse_args(argv)
+    if args.keep_rs3 and not args.from_dat:
+        parser.error('--keep-rs3 can only be used with --from-dat')
+    ext='.dat' if args.from_dat else '.rs3'
+    
+    config=None
+    if args.config is not None:
+        try:
+            config=read_tdt_config(args.config)
+        except (OSError, ValueError) as error:
+            print(f'Problems reading {args.config}: {error}')
+            sys.exit(1)
+        print(f'\nCheck positions and lab fields of {len(config)} specimen(s) read from {args.config}')
+    
+    if args.lab_field is not None or config is not None:
+        # Unattended mode
+        checks_l=parse_checks(args.checks or '')
+        lab_field=None
+        if args.lab_field is not None:
+            try:
+                lab_field=lab_field_text(args.lab_field)
+            except ValueError:
+                print('Please input a valid laboratory field (e.g., 40)')
+                sys.exit(1)
+            print(f'\nLab_field: {lab_field}')
+    else:
+        checks=input("Indicate the measurement number(s) corresponding to the checks (excluding the NRM), separated by commas: ") if args.checks is None else args.checks
+        checks_l=checks.split(',') if checks !='' else []
+        input_lab_field=input("\nIndicate the laboratory field used for experiments (µT): ")
+        try:
+            lab_field=lab_field_text(input_lab_field)
+        except ValueError:
+            print('Please input a valid laboratory field (e.g., 40)')
+            sys.exit()
+        print(f'\nLab_field: {lab_field}')
+    
+    if is_archive(args.folder) and os.path.isfile(args.folder):
+        # The members are read while the files are converted
+        output=args.output or archive_stem(args.folder)
+        with open_sink(output) as sink:
+            n=tdt_stream(iter_members(args.folder, ext, args.include, args.exclude), sink,
+                         checks_l, lab_field, config, args.jobs, args.keep_rs3)
+        print(f'\n{n} *.tdt files written in {output}')
+        return
+    
+    files=filename(args.folder, args.recursive, args.include, args.exclude, ext)
+    
+    if args.output is not None and is_archive(args.output):
+        sources=((os.path.relpath(file, args.folder).replace(os.sep, '/'), _read_file(file))
+                 for file in files)
+        with open_sink(args.output) as sink:
+            n=tdt_stream(sources, sink, checks_l, lab_field, config, args.jobs, args.keep_rs3)
+        print(f'\n{n} *.tdt files written in {args.output}')
+        return
+    
+    run_batch(partial(tdt_file, checks_pos=checks_l, lab_field=lab_field, config=config,
+                      folder=args.folder, output=args.output, keep_rs3=args.keep_rs3),
+              files, args.jobs)
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Dates of the 2G files.
+
+The dates of the steps ('Nov 05 2019 15:12:28') and of the header
+('Nov 05 2019 15:12') are parsed once per different string: the results
+are cached, and parse_times converts all the dates of a collection in a
+single batch into datetime64 values, which can be sorted and filtered.
+
+NumPy is only imported by the functions that return arrays.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+
+# Formats tried, from the most to the least complete, and number of words they use
+TIME_FORMATS=(('%b %d %Y %H:%M:%S', 4), ('%b %d %Y %H:%M', 4), ('%b %d %Y', 3))
+
+
+@lru_cache(maxsize=65536)
+def parse_time(value):
+    """
+    Date and time of a step or of the header as datetime, None if it cannot be read
+    """
+    
+    parts=value.split(' ')
+    for fmt, n in TIME_FORMATS:
+        try:
+            return datetime.strptime(' '.join(parts[:n]), fmt)
+        except ValueError:
+            pass
+    return None
+
+
+@lru_cache(maxsize=65536)
+def utrecht_date(date):
+    """
+    Date 'Nov 05 2019' in the format of the Utrecht files (05/11/2019).
+    Raises ValueError if it is not a valid date
+    """
+    
+    return datetime.strftime(datetime.strptime(date, "%b %d %Y"), "%d/%m/%Y")
+
+
+def parse_times(values):
+    """
+    Converts many dates at once. Each different string is parsed only once
+    
+    Input:
+        values: list of strings (dates of the steps or of the headers)
+    Output:
+        array of datetime64[s] (NaT for the dates that cannot be read)
+    """
+    
+    import numpy as np
+    
+    if len(values)==0:
+        return np.empty(0, dtype='datetime64[s]')
+    unique, inverse=np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    parsed=np.array([parse_time(value) or 'NaT' for value in unique.tolist()],
+                    dtype='datetime64[s]')
+    
+    return parsed[inverse.reshape(-1)]
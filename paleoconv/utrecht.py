@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Utrecht (*.th) output. All the specimens of a folder go in a single file.
+"""
+
+import csv
+
+from paleoconv.timestamps import utrecht_date
+
+
+END_SPECIMEN=[9999]
+
+
+def utrecht_header(header):
+    """
+    Heading of a specimen. The specimen number (second element) is set
+    by UtrechtWriter.add
+    """
+    
+    # print('Over: ', over)
+    name=header[0]
+    vol=header[1]
+    coreA=header[4]
+    coreP=header[5]
+    dipA=(int(header[6])-90)%360
+    
+    if header[8]==0:
+        dipP=header[7]
+    else: 
+        dipP=180-int(header[7])
+    
+    return [name, None, coreA, coreP, vol, dipA, dipP]
+
+
+def utrecht_step(dato, step):
+    """
+    Row of one demagnetization step
+    
+    Input:
+        dato: fields of the step
+        step: step of the previous row, used when the treatment
+            of this one is not recognized
+    """
+    
+    # print('Dato: ', dato)
+    if dato[0]=='NRM': 
+        step=0
+    elif dato[0][-1:]=='C':
+        step=dato[0][:-1]
+    elif dato[0][-2:]=='mT':
+        step=dato[0][:-2]
+    else: pass
+    # print('Step: ', step)
+    x=float(dato[9])
+    y=float(dato[13])
+    z=float(dato[17])
+    a=(-z)*10**9
+    b=(-x)*10**9
+    c=(y)*10**9
+    date=dato[25].split(' ')
+    date=date[0]+' '+date[1]+' '+date[2]
+    time=date[3]
+    # print("Time: ", time)
+    date_out=utrecht_date(date)
+    # print("Date_out: ", date_out)
+    return [step,format(a,'e'),format(b,'e'),format(c,'e'),0.99,date_out,time]
+
+
+def split_name(name_th, part):
+    """
+    Name of the part number 'part' (1, 2...) of a split Utrecht file
+    """
+    
+    return f'{name_th[:-3]}_{part:03d}.th'
+
+
+class UtrechtWriter:
+    """
+    Writes the Utrecht file while the specimens are converted: each block
+    (heading of utrecht_header, rows of utrecht_step and END_SPECIMEN if the
+    specimen has more than one step) is written as soon as it is added, so only
+    one specimen is in memory.
+    
+    With 'split' the specimens are written in several files of 'split'
+    specimens each (Utrecht_format_001.th, Utrecht_format_002.th...), each
+    one with its own heading and END line. The specimens keep the numbering
+    of the whole collection.
+    
+    Use it in a with statement, or call close() at the end. 'label' is the
+    name of the file in the messages (name_th if None).
+    """
+    
+    def __init__(self, name_th='Utrecht_format.th', split=None, label=None):
+        self.name_th=name_th
+        self.label=label or name_th
+        self.split=split
+        self.outputs=[]
+        self.n=0
+        self._file_out=None
+        self._writer=None
+        self._in_file=0
+        self._closed=False
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _open(self):
+        if self.split:
+            name=split_name(self.name_th, len(self.outputs)+1)
+        else:
+            name=self.name_th
+        self.outputs.append(name)
+        self._file_out=open(name,'w')
+        self._writer=csv.writer(self._file_out,delimiter=',',lineterminator='\r\n')
+        self._writer.writerow(['Robot','2G DC'])
+        self._in_file=0
+    
+    def _end(self):
+        self._writer.writerow(['END'])
+        self._file_out.close()
+        self._file_out=None
+    
+    def add(self, cab):
+        """
+        Numbers the specimen and writes its block. Specimens with less
+        than two steps are numbered but not written
+        """
+        
+        self.n+=1
+        cab[0][1]=self.n
+        print('Name: ', cab[0][0])
+        if len(cab)<=1:
+            return
+        
+        if self._file_out is None:
+            self._open()
+        elif self.split and self._in_file>=self.split:
+            self._end()
+            self._open()
+        self._writer.writerows(cab)
+        self._in_file+=1
+    
+    def close(self):
+        """
+        Writes the END line and closes the file
+        """
+        
+        if self._closed:
+            return
+        self._closed=True
+        if self._file_out is None and not self.outputs:
+            # No specimen with steps: file with only the heading and END
+            self._open()
+        if self._file_out is not None:
+            self._end()
+        
+        print( self.n, f'specimens added to "{self.label}')
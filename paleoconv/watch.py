@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Watch mode: the folder is checked every few seconds and the *.dat files
+that are new or have changed are converted as soon as the magnetometer
+has finished writing them.
+
+A file is converted when its size and modification time have not changed
+during 'debounce' seconds, so half-written files are skipped. The
+conversion is incremental (see paleoconv.manifest), so Utrecht_format.th
+is kept up to date with every specimen. The files that are being written
+again (the magnetometer adds each step to the file of the specimen) keep
+their specimen in Utrecht_format.th until they are stable again.
+"""
+
+import time
+
+from paleoconv.manifest import file_state
+
+
+def stable_files(files, seen, now, debounce):
+    """
+    Selects the files that have not changed during 'debounce' seconds
+    
+    Input:
+        files: names of the *.dat files present now
+        seen: dictionary file -> (state, time when that state was first seen).
+            It is updated with the current state of the files
+        now: current time (time.monotonic)
+    Output:
+        List with the stable files, in the order of 'files'
+    """
+    
+    stable=[]
+    for file in files:
+        try:
+            state=file_state(file)
+        except OSError:
+            # Removed while listing the folder
+            continue
+        if file not in seen or seen[file][0]!=state:
+            seen[file]=(state, now)
+        elif now-seen[file][1]>=debounce:
+            stable.append(file)
+    for file in [file for file in seen if file not in files]:
+        del seen[file]
+    
+    return stable
+
+
+def watch(convert, list_files, interval=2., debounce=5.):
+    """
+    Runs until interrupted with Ctrl+C
+    
+    Input:
+        convert: function that converts a list of *.dat files incrementally,
+            convert(files, unstable=files that are still being written)
+        list_files: function that returns the names of the *.dat files in the folder
+        interval: seconds between two checks of the folder
+        debounce: seconds without changes before a file is converted
+    
+    A file is converted at most interval+debounce seconds after its last change.
+    """
+    
+    seen={}
+    done={}
+    print(f'Watching for *.dat files every {interval:g} s (Ctrl+C to stop)')
+    try:
+        while True:
+            now=time.monotonic()
+            files=list_files()
+            stable=stable_files(files, seen, now, debounce)
+            # The files removed while listing the folder are left out
+            files=[file for file in files if file in seen]
+        
+            # Only new, modified or removed files trigger a conversion. A
+            # file that is being written again does not, until it is stable
+            states={file: seen[file][0] for file in stable}
+            if (any(done.get(file)!=state for file, state in states.items()) or
+                    any(file not in seen for file in done)):
+                print(time.strftime('%H:%M:%S'), '-', len(stable), 'stable *.dat files')
+                try:
+                    convert(files, unstable=[file for file in files if file not in states])
+                except Exception as error:
+                    # The files will be tried again when they change
+                    print(f'Conversion failed: {error!r}')
+                done={file: done[file] for file in done if file in seen}
+                done.update(states)
+        
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print('\nWatch mode stopped')
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+@author: pablitolito
+
+Regression check of the pre-flight check (paleoconv.preflight.check_dat):
+on damaged copies of synthetic *.dat files (truncated, bytes changed,
+removed or added), a file passes the check if and only if format_file
+can convert it. The only difference allowed is a truncated header, that
+the check reports even when the formats could read it.
+
+It also checks that decode_header reads the header as the original conv
+did, byte by byte, also when the fields go on after the overturned flag.
+
+Usage: python -m pytest tests
+"""
+
+import os
+import random
+import sys
+
+ROOT=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from make_corpus import demag_steps, specimen, dat_bytes
+from paleoconv.dat2g import decode_header, OVER_POS, DD_POS, DIP_POS, STEP_MARK
+from paleoconv.pipeline import format_file, FORMATS
+from paleoconv.preflight import check_dat, HEADER_SIZE
+
+
+# Sets of formats checked, and number of damaged files of each base file
+FORMAT_SETS=(FORMATS, ('asc',), ('rs3',), ('th',))
+N_MUTATIONS=60
+N_FILES=10
+# Bytes used to damage the files: digits, letters, separators and others
+BYTES=b'0123456789.-+eE xCmTN\x00\xcd\xff\x01'
+
+
+def base_files(seed=0):
+    """
+    Content of N_FILES correct *.dat files (thermal and AF)
+    """
+    
+    rng=random.Random(seed)
+    return [dat_bytes(*specimen(rng, f'S{k:07d}', demag_steps(rng, thermal=k%2==0)))
+            for k in range(N_FILES)]
+
+
+def mutate(rng, buf):
+    """
+    Copy of 'buf' with one random damage
+    """
+    
+    buf=bytearray(buf)
+    pos=rng.randrange(len(buf))
+    kind=rng.randrange(4)
+    if kind==0:
+        return bytes(buf[:pos])
+    if kind==1:
+        buf[pos]=rng.choice(BYTES)
+    elif kind==2:
+        del buf[pos]
+    else:
+        buf.insert(pos, rng.choice(BYTES))
+    return bytes(buf)
+
+
+def conv_header(buf):
+    """
+    Header as the original conv read it: each text field goes on while the
+    repr of the byte is a single character
+    """
+    
+    def text(pos):
+        value=''
+        while len(str(buf[pos:pos+1]))==4:
+            value+=str(buf[pos:pos+1])[2]
+            pos+=1
+        return value
+    
+    gm=1 if buf[33:34]==b'\x01' else 0
+    over=1 if buf[129:130]==b'\x01' else 0
+    return [text(15), text(24), 1-gm, gm, text(111), text(116), text(120), text(125), over,
+            str(buf[37:54])[2:-1]]
+
+
+def converts(buf, formats):
+    try:
+        format_file(buf, formats)
+    except Exception:
+        return False
+    return True
+
+
+def test_correct_files(tmp_path):
+    for k, buf in enumerate(base_files()):
+        path=tmp_path/f'{k}.dat'
+        path.write_bytes(buf)
+        assert check_dat(str(path)) is None
+
+
+def test_damaged_files(tmp_path, capsys):
+    rng=random.Random(1)
+    path=str(tmp_path/'damaged.dat')
+    n_wrong=0
+    for buf in base_files():
+        for i in range(N_MUTATIONS):
+            damaged=mutate(rng, buf)
+            with open(path, 'wb') as f:
+                f.write(damaged)
+            for formats in FORMAT_SETS:
+                problem=check_dat(path, formats)
+                if len(damaged)<HEADER_SIZE:
+                    assert problem is not None
+                    continue
+                assert (problem is None)==converts(damaged, formats), (formats, problem, damaged)
+            n_wrong+=problem is not None
+    # The damages have to find problems, and also leave convertible files
+    assert 0<n_wrong<N_FILES*N_MUTATIONS
+
+
+def test_header_printable_overturned():
+    # Overturned byte printable: the dip goes on with it and with the bytes after it
+    buf=bytearray(base_files()[0])
+    buf[DIP_POS:OVER_POS+1]=b'45678'
+    buf[OVER_POS+1:OVER_POS+3]=b'9A'
+    buf=bytes(buf)
+    header=decode_header(buf)
+    assert header==conv_header(buf)
+    assert header[7].startswith('456789A')
+    assert header[8]==0
+
+
+def test_header_random_bytes():
+    rng=random.Random(2)
+    steps=base_files()[1][base_files()[1].index(STEP_MARK):]
+    for i in range(2000):
+        # Random header bytes, mostly printable, before correct steps
+        header=bytes(rng.choice(b'0123456789 .-abcXYZ\'\\\x00\x01\x7f\xe9')
+                     for j in range(rng.randint(DD_POS, 150)))
+        buf=header+(steps if rng.random()<0.8 else b'')
+        assert decode_header(buf)==conv_header(buf), buf[:160]